@@ -1,7 +1,19 @@
 import streamlit as st
 import numpy as np
-import matplotlib.pyplot as plt
+import os
 import time
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import replace
+from pathlib import Path
+
+from montecarlo import MONTE_CARLO_METRICS, UncertaintyConfig, process_pool, run_monte_carlo
+from profiling import RerunProfile
+from question_store import QuestionStore, StaleEditError
+from rendering import (FrameScheduler, PlaybackCursor, build_histogram, build_plotly_animation, build_sweep_heatmap,
+                       comparison_color, create_trajectory_figure, lod_indices, lod_trail, reset_trajectory_figure)
+from simulation import (OPTIMIZER_GOALS, SOLVER_LABELS, SWEEP_METRICS, SimulationConfig, TrajectoryCache,
+                        collect_streams, open_streams, optimize_angle, simulate, solver_label, sweep)
+from trajectory_io import RUN_FILE_SUFFIX, load_trajectory_set, run_file_bytes, save_sweep, save_trajectory_set
 
 # ================= Page Setup =================
 st.set_page_config(page_title="Projectile Motion", layout="wide")
@@ -14,8 +26,6 @@ st.markdown("""
 # ================= Session State Setup =================
 if "simulation_run" not in st.session_state:
     st.session_state.simulation_run = False
-if "questions" not in st.session_state:
-    st.session_state.questions = []
 if "current_question" not in st.session_state:
     st.session_state.current_question = 0
 if "teacher_mode" not in st.session_state:
@@ -28,6 +38,17 @@ if "correct_answered" not in st.session_state:
     st.session_state.correct_answered = False
 if "edit_mode" not in st.session_state:
     st.session_state.edit_mode = False 
+if "launch_angle" not in st.session_state:
+    st.session_state.launch_angle = 45.0
+
+# ================= Performance Instrumentation =================
+# Timing spans around each stage of a rerun, on with PROJECTILE_DEBUG=1 or ?debug=1 in the URL. The side panel
+# at the end of the page shows the last rerun and exports the session's recent reruns as JSON.
+if "rerun_profile" not in st.session_state:
+    st.session_state.rerun_profile = RerunProfile()
+profile = st.session_state.rerun_profile
+profile.enabled = os.environ.get("PROJECTILE_DEBUG") == "1" or st.query_params.get("debug") == "1"
+profile.start()
 
 # ================= User Inputs =================
 st.markdown("<h3 style='color:#154360;'>⚙️ Simulation Settings</h3>", unsafe_allow_html=True)
@@ -36,7 +57,8 @@ col1, col2 = st.columns(2)
 with col1:
     v0 = st.number_input("🔹 Initial Velocity (m/s)", min_value=0.0, value=50.0, step=0.1, format="%.2f")
 with col2:
-    angle = st.number_input("🔹 Launch Angle (°)", min_value=0.0, max_value=90.0, value=45.0, step=0.1, format="%.2f")
+    angle = st.number_input("🔹 Launch Angle (°)", min_value=0.0, max_value=90.0, step=0.1, format="%.2f",
+                            key="launch_angle")
 
 col3, col4 = st.columns(2)
 with col3:
@@ -50,22 +72,90 @@ st.markdown("<p style='color:gray; font-size:16px;'>If Instantaneous Time = 0, n
 compare_angles = st.checkbox("📐 Compare Complementary Angles (θ & 90°−θ)")
 air_resistance = st.checkbox("🌬️ Air Resistance")
 compare_with_air = st.checkbox("🔄 Compare Trajectories (No Air vs Air Resistance)")
+compare_launches = st.checkbox("🎯 Compare Launches (any v₀, θ and h₀)")
+
+# ================= Comparison Launches =================
+# Every row is one more trajectory, computed and animated together with the ones above
+MAX_COMPARISONS = 20
+comparisons = ()
+if compare_launches:
+    launch_rows = st.data_editor(
+        [{"v0": 40.0, "angle": 30.0, "h0": 0.0, "air": False},
+         {"v0": 40.0, "angle": 60.0, "h0": 0.0, "air": False},
+         {"v0": 60.0, "angle": 45.0, "h0": 0.0, "air": True}],
+        num_rows="dynamic", use_container_width=True, key="launch_rows",
+        column_config={
+            "v0": st.column_config.NumberColumn("v₀ (m/s)", min_value=0.0, step=0.1, format="%.2f"),
+            "angle": st.column_config.NumberColumn("θ (°)", min_value=0.0, max_value=90.0, step=0.1, format="%.2f"),
+            "h0": st.column_config.NumberColumn("h₀ (m)", min_value=0.0, step=0.1, format="%.2f"),
+            "air": st.column_config.CheckboxColumn("🌬️ Air"),
+        })
+    comparisons = tuple((float(row["v0"]), float(row["angle"]), float(row["h0"] or 0.0), bool(row["air"]))
+                        for row in launch_rows if row["v0"] is not None and row["angle"] is not None)
+    if len(comparisons) > MAX_COMPARISONS:
+        st.warning(f"⚠️ Only the first {MAX_COMPARISONS} launches are compared.")
+        comparisons = comparisons[:MAX_COMPARISONS]
+
+# ================= Drag Solver Settings =================
+drag_solver = "rk45"
+solver_tol = 1e-6
+if air_resistance or compare_with_air or any(launch[3] for launch in comparisons):
+    col_solver, col_tol = st.columns(2)
+    with col_solver:
+        drag_solver = st.selectbox("🧮 Drag Solver", list(SOLVER_LABELS),
+                                   format_func=lambda solver: solver_label(solver, SimulationConfig.dt))
+    with col_tol:
+        solver_tol = st.select_slider("🎯 Solver Tolerance", options=[1e-3, 1e-4, 1e-5, 1e-6, 1e-8, 1e-10],
+                                      value=1e-6, format_func=lambda v: f"{v:.0e}",
+                                      disabled=drag_solver != "rk45")
+
+# ================= Animation Settings =================
+ANIMATION_MODES = {"browser": "🌐 Browser (Plotly)", "server": "🖥️ Server (Matplotlib)"}
 
-# ================= Physics and Calculations =================
-g = 9.81
-theta = np.radians(angle)
-
-# Function to calculate flight time
-def calculate_flight_time(v0, theta_rad, h0, g):
-    return (v0 * np.sin(theta_rad) + np.sqrt((v0*np.sin(theta_rad))**2 + 2*g*h0)) / g
-
-t_flight = calculate_flight_time(v0, theta, h0, g)
-
-if t_user > t_flight:
-    st.warning("⏳ The entered time exceeds the flight time! The maximum possible time for the primary trajectory will be used.")
-    t_user = t_flight
+# ================= Start Button =================
+animation_mode = st.radio("🎞️ Animation Mode", list(ANIMATION_MODES), format_func=ANIMATION_MODES.get,
+                          horizontal=True)
+target_fps = 12
+playback_speed = 1.0
+stream_playback = False
+if animation_mode == "server":
+    col_fps, col_speed = st.columns(2)
+    with col_fps:
+        target_fps = st.slider("🎞️ Target FPS", min_value=2, max_value=30, value=12)
+    with col_speed:
+        playback_speed = st.select_slider("⏩ Playback Speed", options=[0.25, 0.5, 1.0, 2.0, 4.0, 8.0], value=1.0,
+                                          format_func=lambda v: f"×{v:g}")
+    stream_playback = st.checkbox("⚡ Stream Playback (start drawing while the solver runs)", value=True)
+start_button = st.button("🚀 Start Simulation", use_container_width=True)
 
-num_points = 600
+# ================= Saved Runs =================
+# A run file exported below replays without recomputation: its settings replace the ones above and its
+# trajectories are played as they were saved. The upload is read in place, without parsing the samples.
+replay_set = None
+with st.expander("💾 Saved Runs"):
+    run_file = st.file_uploader("📂 Load Run File", type=[RUN_FILE_SUFFIX.lstrip(".")])
+    if run_file is not None:
+        try:
+            loaded_set = load_trajectory_set(run_file.getbuffer())
+        except (ValueError, KeyError, TypeError) as exc:
+            st.error(f"❌ Could not read {run_file.name}: {exc}")
+        else:
+            loaded = loaded_set.config
+            st.caption(f"📄 v₀ = {loaded.v0:g} m/s, θ = {loaded.angle:g}°, h₀ = {loaded.h0:g} m, c = {loaded.c:g}, "
+                       f"{solver_label(loaded.solver, loaded.dt)} · "
+                       f"{len(loaded_set.trajectories)} trajectories, "
+                       f"{sum(len(trajectory.t) for trajectory in loaded_set.trajectories.values()):,} samples")
+            if st.checkbox("▶️ Replay Loaded Run", value=True):
+                replay_set = loaded_set
+
+if replay_set is not None:
+    loaded = replay_set.config
+    v0, angle, h0 = loaded.v0, loaded.angle, loaded.h0
+    compare_angles, air_resistance = loaded.compare_angles, loaded.air_resistance
+    compare_with_air, comparisons = loaded.compare_with_air, loaded.comparisons
+    drag_solver, solver_tol = loaded.solver, loaded.tol
+    stream_playback = False
+    st.info(f"▶️ Replaying the saved run ({v0:g} m/s at {angle:g}°); the settings above are not used.")
 
 # ================= Colors Setup =================
 trail_color = 'black'
@@ -73,247 +163,337 @@ bg_color = 'white'
 if air_resistance:
     bg_color = '#00CED1'
 
-# ================= Air Resistance Model =================
-def compute_projectile_with_air(v0, theta, h0, g=9.81, c=0.005, dt=0.01):  
-    t_points = [0]
-    x_points = [0]
-    y_points = [h0]
-    vx = v0 * np.cos(theta)
-    vy = v0 * np.sin(theta)
-    t = 0
-    while y_points[-1] >= 0:
-        v = np.sqrt(vx**2 + vy**2)
-        ax = -c * v * vx
-        ay = -g - c * v * vy
-        vx += ax * dt
-        vy += ay * dt
-        x_points.append(x_points[-1] + vx * dt)
-        y_points.append(y_points[-1] + vy * dt)
-        t += dt
-        t_points.append(t)
-        if t > 100:
-            break
-    return np.array(t_points), np.array(x_points), np.array(y_points)
-
 # ================= Trajectory Calculations =================
-if air_resistance:
-    t_points, x_points, y_points = compute_projectile_with_air(v0, theta, h0)
-    t_flight = t_points[-1]
-else:
-    t_points = np.linspace(0, t_flight, num=num_points)
-    x_points = v0 * np.cos(theta) * t_points
-    y_points = h0 + v0 * np.sin(theta) * t_points - 0.5 * g * t_points**2
-    y_points = np.maximum(y_points, 0)
-
-# Complementary Angle Trajectory Calculation
-if compare_angles and angle != 45:
-    theta2 = np.radians(90 - angle)
-    t_flight2 = calculate_flight_time(v0, theta2, h0, g)
-    
-    if air_resistance:
-        t_points2, x_points2, y_points2 = compute_projectile_with_air(v0, theta2, h0)
-        t_flight2 = t_points2[-1]
+# All physics lives in simulation.py; the page only turns its widgets into a config
+@st.cache_resource
+def get_trajectory_cache():
+    return TrajectoryCache()
+
+trajectory_cache = get_trajectory_cache()
+config = SimulationConfig(v0=v0, angle=angle, h0=h0, air_resistance=air_resistance, compare_angles=compare_angles,
+                          compare_with_air=compare_with_air, comparisons=comparisons, solver=drag_solver,
+                          tol=solver_tol)
+if replay_set is not None:
+    config = replay_set.config
+
+# Legend label of every trajectory the run shows, in the order simulate() returns them
+trail_labels = {"primary": f"{angle:.1f}°"}
+if config.has_secondary:
+    trail_labels["secondary"] = f"{90-angle:.1f}°"
+if config.compare_with_air:
+    trail_labels["no_air"] = f"{angle:.1f}° (No Air)"
+    trail_labels["with_air"] = f"{angle:.1f}° (With Air)"
+for k, (launch_v0, launch_angle, launch_h0, launch_air) in enumerate(comparisons, 1):
+    trail_labels[f"launch_{k}"] = (f"{launch_angle:.1f}°, {launch_v0:g} m/s, h₀ {launch_h0:g} m"
+                                   f"{' (With Air)' if launch_air else ''}")
+# Server playback streams the drag trajectories that are not cached yet. On a Start rerun the first frame only
+# waits for the first chunk of each; on any other rerun the flights are finished at the end of the page, after
+# everything else is drawn. The panels that need the finished flights are filled in when the streams complete.
+with profile.span("physics"):
+    streams = None
+    if animation_mode == "server" and stream_playback:
+        streams = open_streams(config, cache=trajectory_cache)
+        if all(stream.complete for stream in streams.values()):
+            streams = None
+    streaming = streams is not None
+    if streaming:
+        trajectory_set = None
+    elif replay_set is not None:
+        trajectory_set = replay_set
     else:
-        t_points2 = np.linspace(0, t_flight2, num=num_points)
-        x_points2 = v0 * np.cos(theta2) * t_points2
-        y_points2 = h0 + v0 * np.sin(theta2) * t_points2 - 0.5 * g * t_points2**2
-        y_points2 = np.maximum(y_points2, 0)
-
-    t_max = max(t_flight, t_flight2)
-else:
-    x_points2 = y_points2 = t_points2 = None
-    t_flight2 = 0
-    t_max = t_flight
-
-# Compare Air Resistance Trajectories
-if compare_with_air and not compare_angles: 
-    t_flight_no_air = calculate_flight_time(v0, theta, h0, g)
-    t_points_no_air = np.linspace(0, t_flight_no_air, num=num_points)
-    x_points_no_air = v0 * np.cos(theta) * t_points_no_air
-    y_points_no_air = h0 + v0 * np.sin(theta) * t_points_no_air - 0.5 * g * t_points_no_air**2
-    y_points_no_air = np.maximum(y_points_no_air, 0)
-    
-    if air_resistance:
-        t_points_with_air, x_points_with_air, y_points_with_air = t_points, x_points, y_points
+        trajectory_set = simulate(config, cache=trajectory_cache)
+run_info = st.container()
+
+# Solver and cache statistics of a finished run
+def show_run_info(trajectory_set):
+    with run_info:
+        if trajectory_set.drag_total:
+            st.caption(f"🧮 {solver_label(trajectory_set.config.solver, trajectory_set.config.dt)}: "
+                       f"{trajectory_set.solver_steps} steps, "
+                       f"{trajectory_set.solver_nfev} function evaluations "
+                       f"({trajectory_set.drag_cached} of {trajectory_set.drag_total} from cache)")
+        cache_stats = trajectory_cache.stats()
+        st.caption(f"🗄️ Trajectory cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                   f"{cache_stats['entries']} entries ({cache_stats['bytes'] / 1024**2:.1f} MB)")
+        # Written only when clicked, on Streamlit's download thread
+        st.download_button("💾 Export Run", lambda: run_file_bytes(save_trajectory_set, trajectory_set),
+                           file_name=f"projectile_{v0:g}ms_{angle:g}deg{RUN_FILE_SUFFIX}",
+                           mime="application/octet-stream")
+
+if not streaming:
+    show_run_info(trajectory_set)
+
+# ================= Optimal Launch Angle =================
+# Callback: runs before the rerun, so the angle widget can still be set
+def use_angle(best_angle):
+    st.session_state.launch_angle = round(best_angle, 2)
+
+with st.expander("🧭 Optimal Launch Angle (with Air Resistance)"):
+    optimizer_goal = st.radio("Goal", list(OPTIMIZER_GOALS), format_func=OPTIMIZER_GOALS.get, horizontal=True)
+    optimizer_target = None
+    if optimizer_goal == "target_distance":
+        optimizer_target = st.number_input("🔹 Target Distance (m)", min_value=0.1, value=100.0, step=1.0)
+    elif optimizer_goal == "target_height":
+        optimizer_target = st.number_input("🔹 Target Maximum Height (m)", min_value=0.1, value=max(h0, 20.0), step=1.0)
+
+    # Solved only on request (about twenty drag integrations), then kept for as long as the settings it depends
+    # on stay the same; the launch angle is not one of them, so "Use" keeps the answer on screen
+    optimizer_key = (config.v0, config.h0, config.solver, config.tol, config.dt, config.c, optimizer_goal,
+                     optimizer_target)
+    if st.button("🧭 Find Angle", use_container_width=True):
+        with profile.span("optimizer"):
+            st.session_state.optimizer = (optimizer_key, optimize_angle(config, optimizer_goal, optimizer_target,
+                                                                        cache=trajectory_cache))
+    solved_key, solution = st.session_state.get("optimizer", (None, None))
+    if solved_key == optimizer_key:
+        value_label = "Maximum Height" if optimizer_goal == "target_height" else "Range"
+        if not solution.angles:
+            st.warning(f"⚠️ No launch angle reaches that target at v₀ = {v0:.2f} m/s (c = {config.c}).")
+        for k, (best_angle, best_value) in enumerate(zip(solution.angles, solution.values)):
+            col_angle, col_value, col_use = st.columns([2, 2, 1])
+            col_angle.metric("Launch Angle", f"{best_angle:.2f}°")
+            col_value.metric(value_label, f"{best_value:.2f} m")
+            col_use.button("Use", key=f"use_angle_{k}", on_click=use_angle, args=(best_angle,))
+        st.caption(f"🧮 {solution.evaluations} trajectory evaluations, {solution.integrations} integrated "
+                   f"({solution.evaluations - solution.integrations} from cache) · {solver_label(config.solver, config.dt)}")
+
+# ================= Instant Analysis =================
+# Read from the solver's states at t_user, so it is ready without playing the animation. The time is checked
+# against the simulated flight, which is shorter than the vacuum one with drag.
+def analyze_user_time(trajectory_set):
+    primary = trajectory_set["primary"]
+    if t_user > primary.flight_time:
+        with run_info:
+            st.warning("⏳ The entered time exceeds the flight time! The maximum possible time for the primary trajectory will be used.")
+    return primary.state_at(min(t_user, primary.flight_time))
+
+# ================= Session Figure =================
+# One figure per session, reused across reruns and freed with the session
+def get_session_figure():
+    if "sim_figure" not in st.session_state:
+        st.session_state.sim_figure = create_trajectory_figure(trail_color)
+    return st.session_state.sim_figure
+
+# ================= Quiz Fragments =================
+# The quiz runs as Streamlit fragments: a click inside one reruns only that fragment, never the physics and
+# plotting above. Button state changes happen in on_click callbacks, which run before the fragment rerun, so
+# no extra st.rerun() is needed. Questions live in the process-wide QuestionStore, so every session sees the
+# same bank; the student fragment polls it and picks up the teacher's changes on its own.
+QUESTION_DB_PATH = os.environ.get("PROJECTILE_QUESTION_DB", str(Path(__file__).with_name("questions.db")))
+QUESTIONS_PER_PAGE = 20
+QUIZ_REFRESH_SECONDS = 5
+
+@st.cache_resource
+def get_question_store():
+    return QuestionStore(QUESTION_DB_PATH)
+
+question_store = get_question_store()
+
+def start_edit(question_id):
+    st.session_state.edit_id = question_id
+    st.session_state.edit_mode = True
+
+def cancel_edit():
+    st.session_state.edit_mode = False
+    del st.session_state.edit_id
+
+def check_answer(question, radio_key):
+    choice = st.session_state[radio_key]
+    if question["options"].index(choice) == question["correct_index"]:
+        st.session_state.show_answer_result = "correct"
+        st.session_state.correct_answered = True
     else:
-        t_points_with_air, x_points_with_air, y_points_with_air = compute_projectile_with_air(v0, theta, h0)
-    
-    t_max = max(t_flight, t_points_with_air[-1]) if air_resistance else max(t_flight_no_air, t_points_with_air[-1])
-else:
-    t_points_no_air = x_points_no_air = y_points_no_air = None
-    t_points_with_air = x_points_with_air = y_points_with_air = None
+        st.session_state.show_answer_result = "wrong"
+
+def next_question(question_count):
+    if st.session_state.current_question + 1 < question_count:
+        st.session_state.current_question += 1
+    else:
+        st.session_state.test_completed = True
+        st.session_state.celebrate = True
+    st.session_state.show_answer_result = False
+    st.session_state.correct_answered = False
 
-# ================= Simulation Variables Initialization =================
-analysis_done = False
-skip_frames = 8
-sleep_time = 0.0005
-x_user = y_user = vy_user = vx_user = v_total_user = None
+def restart_test():
+    st.session_state.current_question = 0
+    st.session_state.test_completed = False
+    st.session_state.show_answer_result = False
+    st.session_state.correct_answered = False
 
-# ================= Start Button =================
-start_button = st.button("🚀 Start Simulation", use_container_width=True)
+@st.fragment
+@profile.timed("quiz/teacher")
+def teacher_panel():
+    st.markdown("## ✍️ Enter Questions (Shared With All Students)")
+    if "quiz_notice" in st.session_state:
+        st.success(st.session_state.pop("quiz_notice"))
+    with st.form("add_question_form"):
+        q_text = st.text_area("Question Text:")
+        options = [st.text_input(f"Option {i+1}") for i in range(4)]
+        correct_index = st.selectbox("Correct Option Index (1-4):", [1,2,3,4])
+        submitted = st.form_submit_button("➕ Add Question")
+
+        if submitted and q_text and all(options):
+            question_store.add(q_text, options, correct_index - 1)
+            st.session_state.quiz_notice = f"✅ Question {question_store.count()} added successfully"
+            st.rerun()
 
+    # ------------------ Bulk Import / Export ------------------
+    with st.expander("📦 Import / Export Questions"):
+        uploaded = st.file_uploader("Import questions (JSON or CSV)", type=["json", "csv"])
+        if uploaded is not None and st.button("📥 Import"):
+            text = uploaded.getvalue().decode("utf-8-sig")
+            try:
+                if uploaded.name.lower().endswith(".csv"):
+                    imported = question_store.import_csv(text)
+                else:
+                    imported = question_store.import_json(text)
+            except ValueError as exc:
+                st.error(f"❌ Import failed: {exc}")
+            else:
+                st.session_state.quiz_notice = f"✅ Imported {imported} questions"
+                st.rerun()
+        col_json, col_csv = st.columns(2)
+        with col_json:
+            st.download_button("📤 Export JSON", question_store.export_json(), file_name="questions.json",
+                               mime="application/json", on_click="ignore")
+        with col_csv:
+            st.download_button("📤 Export CSV", question_store.export_csv(), file_name="questions.csv",
+                               mime="text/csv", on_click="ignore")
+
+    question_count = question_store.count()
+    if question_count:
+        st.write("### 🧾 Questions List:")
+
+        # Only the selected page is rendered, however large the bank gets
+        page_count = (question_count + QUESTIONS_PER_PAGE - 1) // QUESTIONS_PER_PAGE
+        page = 1
+        if page_count > 1:
+            page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1)
+        first_number = (page - 1) * QUESTIONS_PER_PAGE + 1
+
+        for i, q in enumerate(question_store.page(page - 1, QUESTIONS_PER_PAGE), first_number):
+            col_q, col_btn = st.columns([3, 1])
+            with col_q:
+                st.write(f"{i}. {q['question']}")
+            with col_btn:
+                st.button(f"✏️ Edit", key=f"edit_{q['id']}", on_click=start_edit, args=(q["id"],))
+
+        if st.session_state.edit_mode and "edit_id" in st.session_state:
+            edit_id = st.session_state.edit_id
+            current_q = question_store.get(edit_id)
+            if current_q is not None:
+
+                with st.form(f"edit_form_{edit_id}"):
+                    st.markdown("### ✏️ Edit Question")
+                    edited_q = st.text_area("Question Text:", value=current_q["question"])
+                    edited_options = []
+                    for j in range(4):
+                        edited_options.append(st.text_input(f"Option {j+1}:", 
+                                                          value=current_q["options"][j],
+                                                          key=f"edit_opt_{j}_{edit_id}"))
+                    edited_correct = st.selectbox("Correct Answer:", [1,2,3,4], 
+                                                index=current_q["correct_index"],
+                                                key=f"edit_correct_{edit_id}")
+                    
+                    col_save, col_cancel = st.columns(2)
+                    with col_save:
+                        save_edit = st.form_submit_button("💾 Save Changes")
+                    with col_cancel:
+                        st.form_submit_button("❌ Cancel", on_click=cancel_edit)
+                    
+                    if save_edit:
+                        if edited_q and all(edited_options):
+                            try:
+                                question_store.update(edit_id, edited_q, edited_options, edited_correct - 1,
+                                                      version=current_q["version"])
+                            except StaleEditError:
+                                st.error("❌ This question was changed elsewhere in the meantime. Please review it and save again.")
+                            else:
+                                st.session_state.quiz_notice = "✅ Changes saved successfully!"
+                                st.session_state.edit_mode = False
+                                del st.session_state.edit_id
+                                st.rerun()
+
+    if st.button("🗑️ Clear All Questions"):
+        question_store.clear()
+        st.session_state.current_question = 0
+        st.session_state.test_completed = False
+        st.session_state.show_answer_result = False
+        st.session_state.correct_answered = False
+        st.session_state.edit_mode = False
+        st.session_state.quiz_notice = "All questions cleared successfully."
+        st.rerun()
+
+@st.fragment(run_every=QUIZ_REFRESH_SECONDS)
+@profile.timed("quiz/student")
+def student_panel():
+    st.markdown("## 🧩 Projectile Test")
+    question_ids = question_store.ids()
+    if not question_ids:
+        st.warning("Questions are not set up yet. Please wait for the teacher.")
+    else:
+        if st.session_state.test_completed:
+            if st.session_state.pop("celebrate", False):
+                st.balloons()
+            st.success("🎉 Test completed successfully!")
+            st.button("🔄 Restart Test", on_click=restart_test)
+        else:
+            # The teacher may have removed questions since this student's last step
+            idx = min(st.session_state.current_question, len(question_ids) - 1)
+            st.session_state.current_question = idx
+            question = question_store.get(question_ids[idx])
+            # Keyed on the version too, so an edited question resets the choice
+            radio_key = f"q_{question['id']}_{question['version']}"
+
+            st.write(f"### Question {idx+1} of {len(question_ids)}")
+            st.write(f"**{question['question']}**")
+            
+            st.radio("Choose the answer:", question["options"], key=radio_key)
+
+            # Fixed keys: session state keeps one stored callback per key, and each one holds the page globals of
+            # the rerun that drew it, so per-question keys would keep a whole rerun alive for every question
+            if not st.session_state.correct_answered:
+                st.button("✅ Check Answer", key="check_answer", on_click=check_answer, args=(question, radio_key))
+            
+            if st.session_state.show_answer_result:
+                if st.session_state.show_answer_result == "correct":
+                    st.success("🌟 Correct Answer!")
+                    
+                    col1, col2 = st.columns([1, 2])
+                    with col2:
+                        st.button("➡️ Next" if idx + 1 < len(question_ids) else "🏁 Finish Test",
+                                  key="next_question", on_click=next_question, args=(len(question_ids),))
+                else:
+                    st.error("❌ Wrong Answer, try again!")
 
 # ================= Display Interface =================
 col_left, col_right = st.columns([2, 1])
 
 with col_left:
-    fig, ax = plt.subplots()
+    fig, ax, artists = get_session_figure()
     fig.patch.set_facecolor(bg_color)
     
-    # Determine max range and height for plotting
-    x_max = max(x_points) * 1.1
-    y_max = max(y_points) * 1.2
-    
-    if compare_angles and x_points2 is not None:
-        x_max = max(x_max, max(x_points2) * 1.1)
-        y_max = max(y_max, max(y_points2) * 1.2)
-    
-    if compare_with_air and not compare_angles:
-        x_max = max(x_max, max(x_points_no_air) * 1.1, max(x_points_with_air) * 1.1)
-        y_max = max(y_max, max(y_points_no_air) * 1.2, max(y_points_with_air) * 1.2)
+    # Drag never carries a launch farther or higher than in vacuum, so while streaming the vacuum flights bound
+    # the plot. It can keep one in the air longer (from a height, at terminal speed), so they do not bound time.
+    with profile.span("physics"):
+        bounds = trajectory_set if not streaming else simulate(
+            replace(config, air_resistance=False, compare_with_air=False,
+                    comparisons=tuple(launch[:3] + (False,) for launch in comparisons)), cache=trajectory_cache)
+    x_max = bounds.x_max
+    y_max = bounds.y_max
     
     ax.set_xlim(0, x_max)
     ax.set_ylim(0, y_max)
-    ax.set_xlabel("Range (m)")
-    ax.set_ylabel("Height (m)")
-    ax.set_title("The Projectile Motion Trajectory")
-    ax.grid(True)
     plot_placeholder = st.empty()
 
     # ------------------ Interactive Questions System ------------------
     teacher_view, student_view = st.tabs(["👨‍🏫 Teacher Mode", "👩‍🎓 Student Mode"])
 
     with teacher_view:
-        st.markdown("## ✍️ Enter Questions (Not saved after closing)")
-        with st.form("add_question_form"):
-            q_text = st.text_area("Question Text:")
-            options = [st.text_input(f"Option {i+1}") for i in range(4)]
-            correct_index = st.selectbox("Correct Option Index (1-4):", [1,2,3,4])
-            submitted = st.form_submit_button("➕ Add Question")
-
-            if submitted and q_text and all(options):
-                st.session_state.questions.append({
-                    "question": q_text,
-                    "options": options,
-                    "correct_index": correct_index - 1
-                })
-                st.success(f"✅ Question {len(st.session_state.questions)} added successfully")
-
-        if st.session_state.questions:
-            st.write("### 🧾 Questions List:")
-            
-            for i, q in enumerate(st.session_state.questions, 1):
-                col_q, col_btn = st.columns([3, 1])
-                with col_q:
-                    st.write(f"{i}. {q['question']}")
-                with col_btn:
-                    if st.button(f"✏️ Edit", key=f"edit_{i-1}"):
-                        st.session_state.edit_index = i-1
-                        st.session_state.edit_mode = True
-                        st.rerun()
-
-            if st.session_state.edit_mode and "edit_index" in st.session_state:
-                edit_idx = st.session_state.edit_index
-                if edit_idx < len(st.session_state.questions):
-                    current_q = st.session_state.questions[edit_idx]
-
-                    with st.form(f"edit_form_{edit_idx}"):
-                        st.markdown("### ✏️ Edit Question")
-                        edited_q = st.text_area("Question Text:", value=current_q["question"])
-                        edited_options = []
-                        for j in range(4):
-                            edited_options.append(st.text_input(f"Option {j+1}:", 
-                                                              value=current_q["options"][j],
-                                                              key=f"edit_opt_{j}_{edit_idx}"))
-                        edited_correct = st.selectbox("Correct Answer:", [1,2,3,4], 
-                                                    index=current_q["correct_index"],
-                                                    key=f"edit_correct_{edit_idx}")
-                        
-                        col_save, col_cancel = st.columns(2)
-                        with col_save:
-                            save_edit = st.form_submit_button("💾 Save Changes")
-                        with col_cancel:
-                            cancel_edit = st.form_submit_button("❌ Cancel")
-                        
-                        if save_edit:
-                            if edited_q and all(edited_options):
-                                st.session_state.questions[edit_idx] = {
-                                    "question": edited_q,
-                                    "options": edited_options,
-                                    "correct_index": edited_correct - 1
-                                }
-                                st.success("✅ Changes saved successfully!")
-                                st.session_state.edit_mode = False
-                                del st.session_state.edit_index
-                                st.rerun()
-                        
-                        if cancel_edit:
-                            st.session_state.edit_mode = False
-                            del st.session_state.edit_index
-                            st.rerun()
-
-        if st.button("🗑️ Clear All Questions"):
-            st.session_state.questions.clear()
-            st.session_state.current_question = 0
-            st.session_state.test_completed = False
-            st.session_state.show_answer_result = False
-            st.session_state.correct_answered = False
-            st.session_state.edit_mode = False
-            st.success("All questions cleared successfully.")
-            st.rerun()
+        teacher_panel()
 
     with student_view:
-        st.markdown("## 🧩 Projectile Test")
-        if not st.session_state.questions:
-            st.warning("Questions are not set up yet. Please wait for the teacher.")
-        else:
-            if st.session_state.test_completed:
-                st.balloons()
-                st.success("🎉 Test completed successfully!")
-                if st.button("🔄 Restart Test"):
-                    st.session_state.current_question = 0
-                    st.session_state.test_completed = False
-                    st.session_state.show_answer_result = False
-                    st.session_state.correct_answered = False
-                    st.rerun()
-            else:
-                idx = st.session_state.current_question
-                question = st.session_state.questions[idx]
-
-                st.write(f"### Question {idx+1} of {len(st.session_state.questions)}")
-                st.write(f"**{question['question']}**")
-                
-                choice = st.radio("Choose the answer:", question["options"], key=f"q_{idx}")
-
-                if not st.session_state.correct_answered:
-                    if st.button("✅ Check Answer", key=f"check_{idx}"):
-                        if question["options"].index(choice) == question["correct_index"]:
-                            st.session_state.show_answer_result = "correct"
-                            st.session_state.correct_answered = True
-                        else:
-                            st.session_state.show_answer_result = "wrong"
-                        st.rerun()
-                
-                if st.session_state.show_answer_result:
-                    if st.session_state.show_answer_result == "correct":
-                        st.success("🌟 Correct Answer!")
-                        
-                        col1, col2 = st.columns([1, 2])
-                        with col2:
-                            if st.button("➡️ Next" if idx + 1 < len(st.session_state.questions) else "🏁 Finish Test", 
-                                       key=f"next_{idx}"):
-                                if idx + 1 < len(st.session_state.questions):
-                                    st.session_state.current_question += 1
-                                    st.session_state.show_answer_result = False
-                                    st.session_state.correct_answered = False
-                                    st.rerun()
-                                else:
-                                    st.session_state.test_completed = True
-                                    st.session_state.show_answer_result = False
-                                    st.session_state.correct_answered = False
-                                    st.rerun()
-                    else:
-                        st.error("❌ Wrong Answer, try again!")
+        student_panel()
 
 with col_right:
     results_placeholder = st.empty()
@@ -326,195 +506,367 @@ with col_right:
     else:
         progress_bar_placeholder = st.empty()
 
+# Analysis panel for the user-selected time t_user
+def show_analysis(state):
+    analysis_placeholder.markdown(f"""
+    <div style='background-color:#eaf2f8;padding:15px;border-radius:10px;margin-bottom:10px;font-size:16px;'>
+        <h4>🔍 Analysis At t = {state['t']:.2f} s</h4>
+        <ul>
+            <li>📍  Range: <b>{state['x']:.2f}</b> m</li>
+            <li>📈 Height: <b>{state['y']:.2f}</b> m</li>
+            <li>💨 Vertical Velocity: <b>{state['vy']:.2f}</b> m\s </li>
+            <li>💨 Horizontal Velocity: <b>{state['vx']:.2f}</b> m\s </li>
+            <li>💨 Net Velocity: <b>{state['speed']:.2f}</b> m\s </li>
+        </ul>
+    </div>
+    """, unsafe_allow_html=True)
+
+# ================= Final Results =================
+# Analysis and final results straight from the finished flights: on every rerun, or after a streamed playback.
+# Returns the analysis state (None without an analysis time).
+def show_results(trajectory_set):
+    state_user = None
+    if t_user > 0:
+        state_user = analyze_user_time(trajectory_set)
+        show_analysis(state_user)
+
+    # Final Results Calculations
+    final_results = trajectory_set.final_results()
+    t_flight = final_results["flight_time"]
+    t_max_height = final_results["t_max_height"]
+    final_range_primary = final_results["range"]
+    final_max_height = final_results["max_height"]
+    trajectory_equation = final_results["equation"]
+
+    # ================= RESTORED ORIGINAL FINAL RESULTS BLOCK (SIMPLE) =================
+    final_placeholder.markdown(f"""
+    <div style='background-color:#f4ecf7;padding:15px;border-radius:10px;margin-bottom:10px;font-size:16px;'>
+        <h3>🏁 Final Results</h3>
+        <ul>
+            <li>Flight Time (t'): <b>{t_flight:.2f}</b> s</li>
+            <li>Time To Reach Maximum Height: <b>{t_max_height:.2f}</b> s</li>
+            <li>Range: <b>{final_range_primary:.2f}</b> m</li>
+            <li>Maximum Height: <b>{final_max_height:.2f}</b> m </li>
+            <li>Trajectory Equation: <b>{trajectory_equation}</b></li>
+        </ul>
+    </div>
+    """, unsafe_allow_html=True)
+    return state_user
+
+with profile.span("results"):
+    state_user = None if streaming else show_results(trajectory_set)
+
 # ================= Simulation Loop (Independent Trajectories) =================
-if start_button:
-    
-    # Determine max steps based on max time
-    if not air_resistance:
-        max_steps = num_points
-    else:
-        max_steps = len(t_points)
-        if t_points2 is not None:
-             max_steps = max(max_steps, len(t_points2))
-        if compare_with_air and t_points_with_air is not None:
-             max_steps = max(max_steps, len(t_points_with_air))
-    
-    t_step = t_max / max_steps
-    
-    finished_primary = False
-    finished_secondary = False
-    
+if start_button and animation_mode == "server":
+    # Every trajectory is played from a stream; finished runs are streams that are complete from the start
+    if not streaming:
+        streams = trajectory_set.streams()
+
+    # One frame per 1/fps of wall time, i.e. speed/fps of simulated time, until every trajectory has landed. A
+    # streamed flight's length is only known once its stream completes, so until then the progress bar runs
+    # against the longest of the known flight times, the vacuum estimate and the samples received so far.
+    def flight_time_estimate():
+        return max(float(stream.t[cursor.sample]) if cursor.landed else float(stream.t[-1]) if stream.complete
+                   else max(float(stream.t[-1]), bounds.t_max) for stream, cursor in zip(streams.values(), cursors))
+
+    # Static parts of the figure are set up once per run; frames only move the artists
+    reset_trajectory_figure(ax, artists, trail_labels)
+    heads = {name: artists.get(f"{name}_head") for name in streams}
+
+    # Per-trajectory playback state lives in arrays: the sample each one is drawn at and whether it has landed.
+    # A landed trajectory keeps its last drawing, so a frame only costs the ones still in the air. Each one's
+    # cursor carries its ground search from frame to frame.
+    names = list(streams)
+    sample = np.zeros(len(names), dtype=int)
+    landed = np.zeros(len(names), dtype=bool)
+    cursors = [PlaybackCursor() for _ in names]
+
+    # Trails are drawn from decimated samples, rebuilt only when a stream has grown;
+    # the readouts keep using the full arrays
+    trail_lod = {}
+    def stream_lod(name, stream):
+        if trail_lod.get(name, (None,))[0] != stream.size:
+            trail_lod[name] = (stream.size, lod_indices(stream.y))
+        return trail_lod[name][1]
+
     analysis_done = False
-    x_user = y_user = vy_user = vx_user = v_total_user = None
 
-    # Main Loop based on Max Time
-    for i_main in range(max_steps):
-        
-        current_time = i_main * t_step 
-        
-        # ------------------ Primary Trajectory (θ) ------------------
-        if not finished_primary:
-            if current_time <= t_flight:
-                i = np.argmin(np.abs(t_points - current_time))
-                if y_points[i] <= 0 and i > 5:
-                    finished_primary = True
-                    i = np.where(y_points <= 0)[0][0] if np.any(y_points <= 0) else len(t_points) - 1
-                is_primary_flying = not finished_primary
-            else:
-                i = len(t_points) - 1
-                is_primary_flying = False
-                finished_primary = True
-        else:
-            i = len(t_points) - 1
-            is_primary_flying = False
+    # Main Loop paced by wall-clock time
+    scheduler = FrameScheduler(None, target_fps)
+    for i_main in scheduler:
         
-        # ------------------ Secondary Trajectory (90°-θ) ------------------
-        if compare_angles and t_points2 is not None:
-            if not finished_secondary:
-                if current_time <= t_flight2:
-                    j = np.argmin(np.abs(t_points2 - current_time))
-                    if y_points2[j] <= 0 and j > 5:
-                        finished_secondary = True
-                        j = np.where(y_points2 <= 0)[0][0] if np.any(y_points2 <= 0) else len(t_points2) - 1
-                    is_secondary_flying = not finished_secondary
-                else:
-                    j = len(t_points2) - 1
-                    is_secondary_flying = False
-                    finished_secondary = True
-            else:
-                j = len(t_points2) - 1
-                is_secondary_flying = False
-
-        # ------------------ Other Trajectories (Air Comparison) ------------------
-        if compare_with_air and not compare_angles:
-            k_no_air = np.argmin(np.abs(t_points_no_air - current_time)) if current_time <= t_points_no_air[-1] else len(t_points_no_air) - 1
-            k_with_air = np.argmin(np.abs(t_points_with_air - current_time)) if current_time <= t_points_with_air[-1] else len(t_points_with_air) - 1
+        current_time = i_main * playback_speed / target_fps
 
         # ------------------ Update Plot ------------------
-        if i_main % skip_frames == 0 or i_main == max_steps - 1:
-            ax.clear()
-            
-            ax.set_xlim(0, x_max)
-            ax.set_ylim(0, y_max)
-            ax.set_xlabel("Range (m)")
-            ax.set_ylabel("Height (m)")
-            ax.set_title("The Projectile Motion Trajectory")
-            ax.grid(True)
-
-            # Plot Primary
-            ax.plot(x_points[:i+1], y_points[:i+1], color=trail_color, label=f"{angle:.1f}°")
-            if is_primary_flying:
-                 ax.plot(x_points[i], y_points[i], 'ro', markersize=10) 
-
-            # Plot Secondary
-            if compare_angles and t_points2 is not None:
-                ax.plot(x_points2[:j+1], y_points2[:j+1], color='orange', linestyle='--', label=f"{90-angle:.1f}°")
-                if is_secondary_flying:
-                     ax.plot(x_points2[j], y_points2[j], 'bs', markersize=8)
-
-            # Plot Air Comparison
-            if compare_with_air and not compare_angles:
-                ax.plot(x_points_no_air[:k_no_air+1], y_points_no_air[:k_no_air+1], color='blue', linestyle='-', label=f"{angle:.1f}° (No Air)")
-                ax.plot(x_points_with_air[:k_with_air+1], y_points_with_air[:k_with_air+1], color='red', linestyle='--', label=f"{angle:.1f}° (With Air)")
-
-            ax.legend()
-            if analysis_done:
-                ax.plot(x_user, y_user, 'gs', markersize=10, label=f"Analysis at {t_user:.2f}s")
-                ax.legend()
+        for j in np.flatnonzero(~landed):
+            name = names[j]
+            stream = streams[name]
+            # Backpressure: a stream only integrates as far as this frame needs
+            with profile.span("playback/solve"):
+                stream.ensure(current_time)
+            with profile.span("playback/lookup"):
+                sample[j] = cursors[j].advance(stream.t, stream.y, current_time)
+                landed[j] = cursors[j].landed
+            k = sample[j]
+            with profile.span("playback/draw"):
+                artists[name].set_data(*lod_trail(stream.x, stream.y, stream_lod(name, stream), k))
+                if heads[name] is not None:
+                    heads[name].set_data([stream.x[k]], [stream.y[k]])
+                    heads[name].set_visible(not landed[j])
+
+        with profile.span("playback/render"):
             plot_placeholder.pyplot(fig)
 
         # ------------------ Update Instantaneous Results ------------------
-        if is_primary_flying:
-            # Calculate instantaneous velocities for the primary trajectory
-            i_next = min(i + 1, len(t_points) - 1)
-            
-            if i_next > i: 
-                vx = x_points[i_next] - x_points[i]
-                vy = y_points[i_next] - y_points[i]
-                dt_step = t_points[i_next] - t_points[i]
-                
-                if dt_step > 0:
-                    vx_instant = vx / dt_step
-                    vy_instant = vy / dt_step
-                    v_total = np.sqrt(vx_instant**2 + vy_instant**2)
-                else:
-                    vx_instant = vy_instant = v_total = 0.0
-            else:
-                vx_instant = vy_instant = v_total = 0.0
-
-            results_placeholder.markdown(f"""
-            <div style='background-color:#f7f9f9;padding:15px;border-radius:10px;margin-bottom:10px;font-size:16px;'>
-                <h4>📊 Instant Results ({angle:.1f}°)</h4>
-                <ul>
-                    <li>⏱  Time: <b>{current_time:.2f}</b> (s)</li>
-                    <li>📍  Horizontal Distance (x): <b>{x_points[i]:.2f}</b> m</li>
-                    <li>📈 Height (y): <b>{y_points[i]:.2f}</b> m</li>
-                    <li>💨 Vertical Velocity (Vy): <b>{vy_instant:.2f}</b> m/s</li>
-                    <li>💨 Horizontal Velocity (Vx): <b>{vx_instant:.2f}</b> m/s</li>
-                    <li>💨 Net Velocity (V): <b>{v_total:.2f}</b> m/s</li>
-                </ul>
-            </div>
-            """, unsafe_allow_html=True)
-
-            if not analysis_done and t_user > 0 and current_time >= t_user:
-                x_user = x_points[i]
-                y_user = y_points[i]
-                vy_user = vy_instant
-                vx_user = vx_instant
-                v_total_user = v_total
-                analysis_placeholder.markdown(f"""
-                <div style='background-color:#eaf2f8;padding:15px;border-radius:10px;margin-bottom:10px;font-size:16px;'>
-                    <h4>🔍 Analysis At t = {t_user:.2f} s</h4>
+        # The primary trajectory is always the first
+        primary = streams["primary"]
+        i = sample[0]
+        if not landed[0]:
+            # Instantaneous velocities straight from the solver
+            vx_instant, vy_instant = primary.vx[i], primary.vy[i]
+            v_total = np.hypot(vx_instant, vy_instant)
+
+            with profile.span("playback/readouts"):
+                results_placeholder.markdown(f"""
+                <div style='background-color:#f7f9f9;padding:15px;border-radius:10px;margin-bottom:10px;font-size:16px;'>
+                    <h4>📊 Instant Results ({angle:.1f}°)</h4>
                     <ul>
-                        <li>📍  Range: <b>{x_user:.2f}</b> m</li>
-                        <li>📈 Height: <b>{y_user:.2f}</b> m</li>
-                        <li>💨 Vertical Velocity: <b>{vy_user:.2f}</b> m\s </li>
-                        <li>💨 Horizontal Velocity: <b>{vx_user:.2f}</b> m\s </li>
-                        <li>💨 Net Velocity: <b>{v_total_user:.2f}</b> m\s </li>
+                        <li>⏱  Time: <b>{current_time:.2f}</b> (s)</li>
+                        <li>📍  Horizontal Distance (x): <b>{primary.x[i]:.2f}</b> m</li>
+                        <li>📈 Height (y): <b>{primary.y[i]:.2f}</b> m</li>
+                        <li>💨 Vertical Velocity (Vy): <b>{vy_instant:.2f}</b> m/s</li>
+                        <li>💨 Horizontal Velocity (Vx): <b>{vx_instant:.2f}</b> m/s</li>
+                        <li>💨 Net Velocity (V): <b>{v_total:.2f}</b> m/s</li>
                     </ul>
                 </div>
                 """, unsafe_allow_html=True)
+
+            # The marker appears when the projectile gets to the analysis time
+            if not analysis_done and t_user > 0 and current_time >= t_user:
                 analysis_done = True
+                marker = primary.view().state_at(t_user)
+                trail_labels["analysis"] = f"Analysis at {t_user:.2f}s"
+                legend_handles = [artists[name] for name in trail_labels]
+                artists["analysis"].set_data([marker["x"]], [marker["y"]])
+                artists["analysis"].set_label(trail_labels["analysis"])
+                artists["analysis"].set_visible(True)
+                ax.legend(handles=legend_handles)
         else:
             results_placeholder.empty()
 
         # ------------------ Update Progress Bar ------------------
-        if not compare_angles:
-            progress_bar.progress((i_main + 1) / max_steps)
-            
-        # ------------------ Stop Condition ------------------
-        stop_condition = finished_primary
-        if compare_angles:
-            stop_condition = stop_condition and finished_secondary
-
-        if stop_condition or (compare_with_air and not compare_angles and current_time >= t_max):
+        if landed.all():
             break
-
-        time.sleep(sleep_time)
+        if not compare_angles:
+            t_end = flight_time_estimate()
+            progress_bar.progress(min(1.0, current_time / t_end) if t_end > 0 else 1.0)
 
     # Finalize Progress Bar
     if not compare_angles:
         progress_bar.progress(100)
     
     results_placeholder.empty()
+    profile.add("playback/sleep", scheduler.slept)
+    with col_right:
+        st.caption(f"🎞️ Rendered {scheduler.rendered} frames, dropped {scheduler.dropped} "
+                   f"(target {target_fps} fps, ×{playback_speed:g} speed)")
+
+    # A streamed run is assembled once, now that every stream has finished
+    if streaming:
+        with profile.span("results"):
+            trajectory_set = collect_streams(config, streams)
+            show_run_info(trajectory_set)
+            show_results(trajectory_set)
     
-    # Final Results Calculations
-    t_max_height = v0 * np.sin(theta) / g
-    
-    # We use the final index (i) reached by the primary trajectory
-    final_range_primary = x_points[i]
-    final_max_height = max(y_points)
+# ================= Client-Side Playback =================
+if start_button and animation_mode == "browser":
+    trail_styles = {
+        "primary": {"color": trail_color, "dash": "solid", "marker": {"color": "red", "size": 12}},
+        "secondary": {"color": "orange", "dash": "dash", "marker": {"color": "blue", "symbol": "square", "size": 10}},
+        "no_air": {"color": "blue", "dash": "solid"},
+        "with_air": {"color": "red", "dash": "dash"},
+    }
+    animated = []
+    for name, label in trail_labels.items():
+        trajectory = trajectory_set[name]
+        style = trail_styles.get(name) or {"color": comparison_color(name), "dash": "dashdot",
+                                           "marker": {"color": comparison_color(name), "size": 8}}
+        animated.append({"name": label, "t": trajectory.t, "x": trajectory.x, "y": trajectory.y, **style})
+
+    analysis_point = None
+    if state_user is not None:
+        analysis_point = {"name": f"Analysis at {state_user['t']:.2f}s", "x": state_user["x"], "y": state_user["y"]}
+
+    with profile.span("playback/plotly"):
+        plot_placeholder.plotly_chart(build_plotly_animation(animated, trajectory_set.t_max, x_max, y_max, bg_color,
+                                                             analysis_point))
+    if not compare_angles:
+        progress_bar.progress(100)
 
-    # ================= RESTORED ORIGINAL FINAL RESULTS BLOCK (SIMPLE) =================
-    final_placeholder.markdown(f"""
-    <div style='background-color:#f4ecf7;padding:15px;border-radius:10px;margin-bottom:10px;font-size:16px;'>
-        <h3>🏁 Final Results</h3>
-        <ul>
-            <li>Flight Time (t'): <b>{t_flight:.2f}</b> s</li>
-            <li>Time To Reach Maximum Height: <b>{t_max_height:.2f}</b> s</li>
-            <li>Range: <b>{final_range_primary:.2f}</b> m</li>
-            <li>Maximum Height: <b>{final_max_height:.2f}</b> m </li>
-            <li>Trajectory Equation: <b>y(x) = {h0:.2f} + x.tan({angle:.2f}°) - (9.81/(2*({v0:.2f}·cos({angle:.2f}°))²)).x²</b></li>
-        </ul>
-    </div>
-    """, unsafe_allow_html=True)
+# ================= Parameter Sweep =================
+# Whole grids are cheap (closed form, or one lockstep drag batch), so each distinct grid is computed once.
+# The result is shared by all sessions rather than copied per rerun, so its arrays are made read-only.
+@st.cache_resource(max_entries=16, show_spinner=False)
+def run_sweep(v_range, n_velocities, angle_range, n_angles, heights, drag):
+    start = time.perf_counter()
+    result = sweep(np.linspace(*v_range, n_velocities), np.linspace(*angle_range, n_angles), heights, drag)
+    result["elapsed"] = time.perf_counter() - start
+    for value in result.values():
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+    return result
+
+# A fragment behind an opt-in toggle: the page runs an expander's body even when it is collapsed, and a
+# 200 x 200 contour plot is about half a megabyte of figure JSON, so nothing is computed or sent until the
+# heatmaps are asked for. Changing a sweep setting reruns only this panel.
+@st.fragment
+@profile.timed("sweep")
+def sweep_panel():
+    if not st.toggle("🗺️ Show Heatmaps", key="show_sweep"):
+        return
+    col_sv, col_sa = st.columns(2)
+    with col_sv:
+        sweep_v_range = st.slider("🔹 Velocity Range (m/s)", 1.0, 200.0, (5.0, 100.0), step=1.0)
+        sweep_n_velocities = st.slider("🔹 Velocity Steps", 10, 200, 200, step=10)
+    with col_sa:
+        sweep_angle_range = st.slider("🔹 Angle Range (°)", 0.0, 90.0, (1.0, 89.0), step=0.5)
+        sweep_n_angles = st.slider("🔹 Angle Steps", 10, 200, 200, step=10)
+    sweep_heights_text = st.text_input("🔹 Initial Heights (m, comma-separated)", value=f"0, {h0:g}" if h0 else "0, 10, 20")
+    # Opt-in as well: a drag sweep takes about a second
+    sweep_drag = st.checkbox("🌬️ Sweep With Air Resistance")
+
+    try:
+        sweep_heights = tuple(sorted({float(h) for h in sweep_heights_text.split(",") if h.strip()}))
+    except ValueError:
+        sweep_heights = ()
+    if not sweep_heights or min(sweep_heights) < 0:
+        st.warning("⚠️ Enter one or more non-negative heights, e.g. 0, 10, 20.")
+    else:
+        sweep_result = run_sweep(sweep_v_range, sweep_n_velocities, sweep_angle_range, sweep_n_angles,
+                                 sweep_heights, sweep_drag)
+        col_metric, col_height = st.columns(2)
+        with col_metric:
+            sweep_metric = st.radio("📊 Metric", list(SWEEP_METRICS), format_func=SWEEP_METRICS.get, horizontal=True)
+        with col_height:
+            sweep_height_index = st.selectbox("📏 Height Slice", range(len(sweep_heights)),
+                                              format_func=lambda k: f"{sweep_heights[k]:g} m")
+        st.plotly_chart(build_sweep_heatmap(sweep_result, sweep_metric, SWEEP_METRICS[sweep_metric],
+                                            sweep_height_index))
+        launches = sweep_result["range"].size
+        st.caption(f"⏱️ {launches:,} launches swept in {sweep_result['elapsed'] * 1e3:.0f} ms "
+                   f"({'lockstep drag batch' if sweep_drag else 'closed form'})")
+        st.download_button("💾 Export Sweep", lambda: run_file_bytes(save_sweep, sweep_result),
+                           file_name=f"sweep{RUN_FILE_SUFFIX}", mime="application/octet-stream")
+
+with st.expander("🗺️ Parameter Sweep (Heatmaps)"):
+    sweep_panel()
+
+# ================= Monte Carlo Uncertainty =================
+# Drag samples run on a process pool shared by all sessions, one worker per core; the closed form is fast
+# enough to run inline. A session keeps only the summaries and histograms of its last run, not the samples.
+MONTE_CARLO_SAMPLES = [10_000, 100_000, 250_000, 500_000, 1_000_000]
+
+@st.cache_resource
+def get_process_pool():
+    return process_pool()
+
+with st.expander("🎲 Monte Carlo Uncertainty"):
+    st.markdown("<p style='color:gray;'>Every input is drawn from a normal distribution around the settings above.</p>",
+                unsafe_allow_html=True)
+    col_mv, col_ma = st.columns(2)
+    with col_mv:
+        mc_v0_sd = st.number_input("🔹 Velocity Std. Dev. (m/s)", min_value=0.0, value=1.0, step=0.1)
+    with col_ma:
+        mc_angle_sd = st.number_input("🔹 Angle Std. Dev. (°)", min_value=0.0, value=1.0, step=0.1)
+    col_mh, col_mc = st.columns(2)
+    with col_mh:
+        mc_h0_sd = st.number_input("🔹 Height Std. Dev. (m)", min_value=0.0, value=0.0, step=0.1)
+    with col_mc:
+        mc_c_sd = st.number_input("🔹 Drag Coefficient Std. Dev.", min_value=0.0, value=0.0005, step=0.0001,
+                                  format="%.4f")
+    col_ms, col_md = st.columns(2)
+    with col_ms:
+        mc_samples = st.select_slider("🔹 Samples", options=MONTE_CARLO_SAMPLES, value=100_000,
+                                      format_func=lambda n: f"{n:,}")
+    with col_md:
+        mc_drag = st.checkbox("🌬️ Sample With Air Resistance", value=True)
+    col_run, col_cancel = st.columns(2)
+    with col_run:
+        run_mc = st.button("🎲 Run Monte Carlo", use_container_width=True)
+    with col_cancel:
+        # Any click reruns the page, which stops a running sampler at its next progress update
+        cancel_mc = st.button("⏹️ Cancel", use_container_width=True)
+
+    if run_mc:
+        mc_config = UncertaintyConfig(v0=v0, v0_sd=mc_v0_sd, angle=angle, angle_sd=mc_angle_sd, h0=h0,
+                                      h0_sd=mc_h0_sd, c_sd=mc_c_sd, drag=mc_drag, samples=mc_samples)
+        mc_progress = progress_bar if not compare_angles else progress_bar_placeholder
+
+        def show_mc_progress(done, total):
+            mc_progress.progress(done / total, text=f"🎲 Monte Carlo: {done} of {total} batches")
+
+        executor = get_process_pool() if mc_drag else None
+        with profile.span("monte_carlo"):
+            try:
+                mc_result = run_monte_carlo(mc_config, executor, progress=show_mc_progress)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory), which leaves the shared pool unusable for good; it is
+                # replaced for every session and this run is retried once on the new one
+                executor.shutdown(wait=False, cancel_futures=True)
+                get_process_pool.clear()
+                executor = get_process_pool()
+                mc_result = run_monte_carlo(mc_config, executor, progress=show_mc_progress)
+        st.session_state.monte_carlo = {
+            "summaries": {metric: mc_result.summary(metric) for metric in MONTE_CARLO_METRICS},
+            "histograms": {metric: mc_result.histogram(metric) for metric in MONTE_CARLO_METRICS},
+            "completed": mc_result.completed,
+            "elapsed": mc_result.elapsed,
+            "workers": os.cpu_count() if executor is not None else 1,
+        }
+    elif cancel_mc:
+        st.info("⏹️ Monte Carlo run cancelled.")
+
+    if "monte_carlo" in st.session_state:
+        mc = st.session_state.monte_carlo
+        mc_metric = st.radio("📊 Outcome", list(MONTE_CARLO_METRICS), format_func=MONTE_CARLO_METRICS.get,
+                             horizontal=True)
+        summary = mc["summaries"][mc_metric]
+        col_mean, col_low, col_high = st.columns(3)
+        col_mean.metric("Mean", f"{summary['mean']:.2f}", f"± {summary['mean_ci'][1] - summary['mean']:.3f} (95% CI)",
+                        delta_color="off")
+        col_low.metric("2.5th Percentile", f"{summary['interval'][0]:.2f}")
+        col_high.metric("97.5th Percentile", f"{summary['interval'][1]:.2f}")
+        st.plotly_chart(build_histogram(*mc["histograms"][mc_metric], MONTE_CARLO_METRICS[mc_metric], summary))
+        st.caption(f"⏱️ {mc['completed']:,} samples in {mc['elapsed']:.2f} s "
+                   f"({mc['completed'] / mc['elapsed']:,.0f} samples/s on {mc['workers']} processes)")
+
+# ================= Deferred Solve =================
+# A rerun without Start that opened uncached drag streams finishes them last, so the settings and panels above
+# are already on screen. The status line is redrawn as they advance, which also lets Streamlit stop this run as
+# soon as a newer one is requested: pressing Start right after a change streams the playback instead of waiting.
+if streaming and not start_button:
+    with profile.span("physics"):
+        status_shown = 0.0
+        for stream in {id(stream): stream for stream in streams.values()}.values():
+            while not stream.complete:
+                stream.ensure(stream.t[-1] + 1.0 if stream.size else 0.0)
+                if time.perf_counter() - status_shown > 0.1:
+                    final_placeholder.caption(f"⏳ Solving the flights… t = {stream.t[-1]:.1f} s")
+                    status_shown = time.perf_counter()
+        trajectory_set = collect_streams(config, streams)
+    show_run_info(trajectory_set)
+    with profile.span("results"):
+        show_results(trajectory_set)
+
+# ================= Performance Panel =================
+# Drawn last, so the rerun's record is complete; reruns of a fragment alone get records of their own
+profile.finish()
+if profile.enabled:
+    with st.sidebar:
+        st.markdown("### 🐞 Rerun Timing")
+        record = profile.current
+        st.caption(f"⏱️ Last rerun: {record['total_ms']:.0f} ms, {len(record['spans'])} spans "
+                   f"({len(profile.records)} reruns recorded)")
+        st.dataframe(RerunProfile.rows(record), hide_index=True, use_container_width=True)
+        st.download_button("📥 Export Timings (JSON)", profile.to_json, file_name="rerun_timings.json",
+                           mime="application/json", on_click="ignore")
@@ -0,0 +1,216 @@
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import time
+from dataclasses import replace
+
+import numpy as np
+
+from simulation import SimulationConfig, TrajectoryCache, simulate
+from trajectory_io import RUN_FILE_SUFFIX, save_trajectory_set
+
+# ================= Headless Batch Runs =================
+# Worksheets and answer keys for many launches without a Streamlit server:
+#   python batch.py launches.csv                          # results table on stdout
+#   python batch.py launches.json --out answers.csv       # .csv or .json, by extension
+#   python batch.py launches.csv --trajectories runs/     # plus one t, x, y, vx, vy CSV per launch
+#   python batch.py launches.csv --trajectories runs/ --binary   # ... or one run file per launch (trajectory_io)
+#   python batch.py launches.csv --plots plots/           # plus one PNG per launch (imports matplotlib)
+# Only the simulation core is imported up front; plotting libraries load when plots are asked for.
+# A launch file is a CSV with a header row, or a JSON list of objects, using the SimulationConfig field names
+# below; missing fields take the page's defaults and an optional "name" labels the row.
+
+CONFIG_FIELDS = {"v0": float, "angle": float, "h0": float, "air_resistance": bool, "solver": str, "tol": float,
+                 "dt": float, "c": float, "g": float}
+RESULT_FIELDS = ["name", "v0", "angle", "h0", "air_resistance", "solver", "flight_time", "t_max_height", "range",
+                 "max_height", "equation"]
+# Allowed values, as the page's widgets allow them: (low, high, low is allowed); None is unbounded
+CONFIG_LIMITS = {"v0": (0.0, None, True), "angle": (0.0, 90.0, True), "h0": (0.0, None, True),
+                 "tol": (0.0, None, False), "dt": (0.0, None, False), "c": (0.0, None, True), "g": (0.0, None, False)}
+# How the field kinds are named in error messages
+KIND_NAMES = {float: "a number", bool: "a yes/no value", str: "text"}
+# Answer-key numbers are rounded to this many decimals (the page shows two)
+RESULT_DIGITS = 3
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("1", "true", "yes", "y"):
+        return True
+    if text in ("0", "false", "no", "n", ""):
+        return False
+    raise ValueError(f"not a yes/no value: {value!r}")
+
+
+def _check_range(number, field, value):
+    low, high, low_allowed = CONFIG_LIMITS[field]
+    if high is not None:
+        valid, bound = low <= value <= high, f"between {low:g} and {high:g}"
+    elif low_allowed:
+        valid, bound = value >= low, f"at least {low:g}"
+    else:
+        valid, bound = value > low, f"greater than {low:g}"
+    # NaN fails every comparison; infinity passes the unbounded ones
+    if not valid or not math.isfinite(value):
+        raise ValueError(f"Launch {number}: {field} must be a finite number {bound}, got {value:g}")
+
+
+# One launch record -> (name, SimulationConfig); blank CSV cells count as missing
+def parse_launch(record, number):
+    if not isinstance(record, dict):
+        raise ValueError(f"Launch {number}: expected an object of launch fields, got {json.dumps(record)}")
+    unknown = set(record) - set(CONFIG_FIELDS) - {"name"}
+    if unknown:
+        raise ValueError(f"Launch {number}: unknown fields {', '.join(sorted(unknown))}")
+    values = {}
+    for field, kind in CONFIG_FIELDS.items():
+        value = record.get(field)
+        if value is None or value == "":
+            continue
+        # JSON can hold lists, objects and true/false here; float() would fail obscurely or read true as 1.0
+        if isinstance(value, (list, dict)) or (isinstance(value, bool) and kind is not bool):
+            raise ValueError(f"Launch {number}: {field}: expected {KIND_NAMES[kind]}, got {json.dumps(value)}")
+        try:
+            values[field] = _parse_bool(value) if kind is bool else kind(value)
+        except ValueError as exc:
+            raise ValueError(f"Launch {number}: {field}: {exc}") from exc
+        if field in CONFIG_LIMITS:
+            _check_range(number, field, values[field])
+    if values.get("solver", "rk45") not in ("rk45", "euler"):
+        raise ValueError(f"Launch {number}: solver must be rk45 or euler")
+    name = str(record.get("name") or f"launch_{number}")
+    return name, SimulationConfig(**values)
+
+
+def read_launches(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".json"):
+            records = json.load(f)
+            if not isinstance(records, list):
+                raise ValueError("Expected a JSON list of launches")
+        else:
+            records = list(csv.DictReader(f))
+    return [parse_launch(record, number) for number, record in enumerate(records, 1)]
+
+
+# Launches per solve: their drag trajectories go through the cache together, so a chunk must fit in it
+CHUNK_LAUNCHES = 256
+
+
+# Drag launches of a chunk that share solver settings are integrated in one batch, as comparison launches
+# of a single configuration; the per-launch solves below then find them in the cache
+def _warm_cache(chunk, cache):
+    groups = {}
+    for _, config in chunk:
+        if config.air_resistance:
+            settings = replace(config, v0=SimulationConfig.v0, angle=SimulationConfig.angle, h0=SimulationConfig.h0,
+                               air_resistance=False)
+            groups.setdefault(settings, []).append((config.v0, config.angle, config.h0, True))
+    for settings, comparisons in groups.items():
+        simulate(replace(settings, comparisons=tuple(comparisons)), cache)
+
+
+# Final results of every launch, in file order; launches repeated in the file are solved once
+def run_batch(launches):
+    cache = TrajectoryCache(max_entries=2 * CHUNK_LAUNCHES, max_bytes=256 * 1024**2)
+    rows = []
+    trajectory_sets = []
+    for start in range(0, len(launches), CHUNK_LAUNCHES):
+        chunk = launches[start:start + CHUNK_LAUNCHES]
+        _warm_cache(chunk, cache)
+        for name, config in chunk:
+            trajectory_set = simulate(config, cache)
+            results = {key: round(value, RESULT_DIGITS) if isinstance(value, float) else value
+                       for key, value in trajectory_set.final_results().items()}
+            rows.append({"name": name, "v0": config.v0, "angle": config.angle, "h0": config.h0,
+                         "air_resistance": config.air_resistance, "solver": config.solver, **results})
+            trajectory_sets.append(trajectory_set)
+    return rows, trajectory_sets
+
+
+def write_results(rows, out):
+    if out is not None and out.lower().endswith(".json"):
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+        return
+    f = open(out, "w", newline="", encoding="utf-8") if out else sys.stdout
+    try:
+        writer = csv.DictWriter(f, RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    finally:
+        if out:
+            f.close()
+
+
+def _safe_name(name):
+    return "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in name)
+
+
+# CSV holds the launch's own trajectory; a run file holds the whole set with its settings and replays in the app
+def write_trajectories(rows, trajectory_sets, directory, binary=False):
+    os.makedirs(directory, exist_ok=True)
+    for row, trajectory_set in zip(rows, trajectory_sets):
+        if binary:
+            save_trajectory_set(os.path.join(directory, f"{_safe_name(row['name'])}{RUN_FILE_SUFFIX}"), trajectory_set)
+            continue
+        primary = trajectory_set["primary"]
+        np.savetxt(os.path.join(directory, f"{_safe_name(row['name'])}.csv"),
+                   np.column_stack([primary.t, primary.x, primary.y, primary.vx, primary.vy]),
+                   delimiter=",", header="t,x,y,vx,vy", comments="", fmt="%.6g")
+
+
+# The page's trajectory figure, one PNG per launch
+def write_plots(rows, trajectory_sets, directory):
+    from rendering import create_trajectory_figure, reset_trajectory_figure
+
+    os.makedirs(directory, exist_ok=True)
+    fig, ax, artists = create_trajectory_figure()
+    for row, trajectory_set in zip(rows, trajectory_sets):
+        primary = trajectory_set["primary"]
+        ax.set_xlim(0, trajectory_set.x_max)
+        ax.set_ylim(0, trajectory_set.y_max)
+        ax.set_title(row["name"])
+        reset_trajectory_figure(ax, artists, {"primary": f"{row['angle']:.1f}°"})
+        artists["primary"].set_data(primary.x, primary.y)
+        fig.savefig(os.path.join(directory, f"{_safe_name(row['name'])}.png"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a file of projectile launches without the web app")
+    parser.add_argument("launches", help="CSV or JSON file of launch settings")
+    parser.add_argument("--out", help="results file (.csv or .json); CSV on stdout by default")
+    parser.add_argument("--trajectories", metavar="DIR", help="also write each launch's samples as CSV")
+    parser.add_argument("--binary", action="store_true", help=f"write trajectories as {RUN_FILE_SUFFIX} run files")
+    parser.add_argument("--plots", metavar="DIR", help="also draw each launch as PNG")
+    parser.add_argument("--timing", action="store_true", help="report load, solve and write times on stderr")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        launches = read_launches(args.launches)
+    except (OSError, ValueError) as exc:
+        parser.error(str(exc))
+    loaded = time.perf_counter()
+    rows, trajectory_sets = run_batch(launches)
+    solved = time.perf_counter()
+    write_results(rows, args.out)
+    if args.trajectories:
+        write_trajectories(rows, trajectory_sets, args.trajectories, args.binary)
+    if args.plots:
+        write_plots(rows, trajectory_sets, args.plots)
+    written = time.perf_counter()
+
+    if args.timing:
+        print(f"{len(rows)} launches: load {(loaded - start) * 1e3:.1f} ms, solve {(solved - loaded) * 1e3:.1f} ms, "
+              f"write {(written - solved) * 1e3:.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from montecarlo import UncertaintyConfig, run_monte_carlo
+from rendering import build_plotly_animation, create_trajectory_figure, lod_indices, lod_trail, reset_trajectory_figure
+from simulation import (SimulationConfig, TrajectoryCache, integrate_drag_batch, integrate_drag_rk45, open_streams,
+                        optimize_angle, simulate, sweep)
+from trajectory_io import load_trajectory_set, run_file_bytes, save_trajectory_set
+
+# ================= Benchmark Suite =================
+# Reproducible timings for the headless core and the renderers, run without Streamlit:
+#   python benchmarks.py                          # print the table
+#   python benchmarks.py --json results.json      # also save the results
+#   python benchmarks.py --baseline results.json  # fail (exit 1) on cases slower than the baseline
+# Every case is a fixed configuration; the median of the repeats is compared, and peak memory is the
+# tracemalloc peak of one extra run (not measured for the startup cases, whose work is in a child process).
+
+# Extra launches of the comparison table: 2 against 20 should cost about the same
+COMPARISONS_2 = tuple((40.0 + 2 * k, 30.0 + 3 * k, 0.0, True) for k in range(2))
+COMPARISONS_20 = tuple((40.0 + 2 * k, 30.0 + 3 * k, 0.0, True) for k in range(20))
+
+# Page configurations a rerun typically sees
+RERUN_CONFIGS = {
+    "no_air": SimulationConfig(),
+    "drag_rk45": SimulationConfig(air_resistance=True),
+    "drag_euler": SimulationConfig(air_resistance=True, solver="euler"),
+    "drag_compare_angles": SimulationConfig(angle=30, air_resistance=True, compare_angles=True),
+    "air_comparison": SimulationConfig(compare_with_air=True),
+    "high_drag_euler": SimulationConfig(v0=200, angle=70, air_resistance=True, solver="euler"),
+    "compare_2_launches": SimulationConfig(comparisons=COMPARISONS_2),
+    "compare_20_launches": SimulationConfig(comparisons=COMPARISONS_20),
+    "compare_20_launches_euler": SimulationConfig(comparisons=COMPARISONS_20, solver="euler"),
+}
+
+
+def _solver_cases():
+    angles = np.radians(np.linspace(5, 85, 1000))
+    return {
+        "solver/euler_single": lambda: integrate_drag_batch(50.0, np.radians(45), 0.0),
+        "solver/euler_batch_1000": lambda: integrate_drag_batch(50.0, angles, 0.0),
+        "solver/rk45_single": lambda: integrate_drag_rk45(50.0, np.radians(45), 0.0),
+        "solver/rk45_tight": lambda: integrate_drag_rk45(50.0, np.radians(45), 0.0, rtol=1e-10, atol=1e-10),
+    }
+
+
+# The page's default sweep: a 200 x 200 velocity/angle grid, one height without drag and with drag
+def _sweep_cases():
+    velocities = np.linspace(5, 100, 200)
+    angles = np.linspace(1, 89, 200)
+    return {
+        "sweep/no_drag_200x200x3": lambda: sweep(velocities, angles, [0, 10, 20]),
+        "sweep/drag_200x200": lambda: sweep(velocities, angles, [0], drag=True),
+    }
+
+
+# Time to the first playable chunk of an uncached run, which must not grow with the flight's sample count,
+# against integrating the same run in full
+def _stream_cases():
+    cases = {}
+    for dt in (0.01, 0.0001):
+        config = SimulationConfig(v0=300, angle=70, air_resistance=True, solver="euler", dt=dt)
+        cases[f"stream/first_chunk_dt{dt:g}"] = lambda config=config: open_streams(config)["primary"].ensure(0.0)
+        cases[f"stream/full_run_dt{dt:g}"] = lambda config=config: open_streams(config)["primary"].finish()
+    return cases
+
+
+# Cold solves with the page's drag settings; warm solves are pure cache lookups
+def _optimizer_cases():
+    config = SimulationConfig(air_resistance=True)
+    return {
+        "optimize/max_range": lambda: optimize_angle(config),
+        "optimize/target_distance": lambda: optimize_angle(config, "target_distance", 100.0),
+        "optimize/max_range_euler": lambda: optimize_angle(SimulationConfig(air_resistance=True, solver="euler")),
+    }
+
+
+# The page's default uncertainty run, inline (one process); a pool splits the same batches across cores
+def _montecarlo_cases():
+    return {
+        "montecarlo/drag_100k": lambda: run_monte_carlo(UncertaintyConfig()),
+        "montecarlo/no_drag_1M": lambda: run_monte_carlo(UncertaintyConfig(drag=False, samples=1_000_000)),
+    }
+
+
+# Saving and reloading a 170,000-sample run: a reload maps the file and must not read the samples
+def _export_cases():
+    trajectory_set = simulate(SimulationConfig(v0=300, angle=70, air_resistance=True, solver="euler", dt=0.0001))
+    data = run_file_bytes(save_trajectory_set, trajectory_set)
+    return {
+        "export/save_long_run": lambda: run_file_bytes(save_trajectory_set, trajectory_set),
+        "export/load_long_run": lambda: load_trajectory_set(data),
+    }
+
+
+# Cold start of a fresh interpreter: the batch CLI's imports against the page's
+# Case name prefixes that run in a child process, out of reach of tracemalloc
+SUBPROCESS_GROUPS = ("startup/",)
+
+
+def _startup_cases():
+    # Run next to this file so the repo modules import whatever directory the suite is started from
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    def cold_import(modules):
+        return lambda: subprocess.run([sys.executable, "-c", f"import {modules}"], check=True, cwd=here)
+
+    return {
+        "startup/batch_cli": cold_import("batch"),
+        "startup/page_imports": cold_import("streamlit, numpy, matplotlib.pyplot, plotly.graph_objects"),
+    }
+
+
+# A warm case gets its own cache, which the untimed first call in measure() fills
+def _rerun_cases():
+    cases = {}
+    for name, config in RERUN_CONFIGS.items():
+        cases[f"rerun/{name}/cold"] = lambda config=config: simulate(config)
+        cases[f"rerun/{name}/warm"] = lambda config=config, cache=TrajectoryCache(): simulate(config, cache=cache)
+    return cases
+
+
+def _render_cases():
+    trajectory_set = simulate(RERUN_CONFIGS["drag_compare_angles"])
+    primary, secondary = trajectory_set["primary"], trajectory_set["secondary"]
+    fig, ax, artists = create_trajectory_figure()
+    ax.set_xlim(0, trajectory_set.x_max)
+    ax.set_ylim(0, trajectory_set.y_max)
+    reset_trajectory_figure(ax, artists, {"primary": "30.0°", "secondary": "60.0°"})
+    frame = {"i": 0}
+    primary_lod, secondary_lod = lod_indices(primary.y), lod_indices(secondary.y)
+
+    # One server-side frame: move the artists and encode the PNG that st.pyplot sends
+    def matplotlib_frame():
+        i = frame["i"] = (frame["i"] + 37) % len(primary.t)
+        artists["primary"].set_data(*lod_trail(primary.x, primary.y, primary_lod, i))
+        artists["primary_head"].set_data([primary.x[i]], [primary.y[i]])
+        artists["secondary"].set_data(*lod_trail(secondary.x, secondary.y, secondary_lod, i))
+        fig.savefig(io.BytesIO(), format="png")
+
+    # The same frame for a fine-step run (10,000+ samples): the drawn vertex count must not follow the step
+    long_run = simulate(RERUN_CONFIGS["high_drag_euler"])["primary"]
+    long_fig, long_ax, long_artists = create_trajectory_figure()
+    long_ax.set_xlim(0, long_run.x.max() * 1.1)
+    long_ax.set_ylim(0, long_run.y.max() * 1.2)
+    reset_trajectory_figure(long_ax, long_artists, {"primary": "70.0°"})
+    long_lod = lod_indices(long_run.y)
+
+    def matplotlib_frame_fine_step():
+        i = frame["i"] = (frame["i"] + 37) % len(long_run.t)
+        long_artists["primary"].set_data(*lod_trail(long_run.x, long_run.y, long_lod, i))
+        long_artists["primary_head"].set_data([long_run.x[i]], [long_run.y[i]])
+        long_fig.savefig(io.BytesIO(), format="png")
+
+    # A frame of a 20-launch comparison halfway through the flights
+    many = simulate(RERUN_CONFIGS["compare_20_launches"])
+    many_fig, many_ax, many_artists = create_trajectory_figure()
+    many_ax.set_xlim(0, many.x_max)
+    many_ax.set_ylim(0, many.y_max)
+    reset_trajectory_figure(many_ax, many_artists, {name: name for name in many.trajectories})
+    many_lod = {name: lod_indices(trajectory.y) for name, trajectory in many.trajectories.items()}
+
+    def matplotlib_frame_20_launches():
+        for name, trajectory in many.trajectories.items():
+            i = len(trajectory.t) // 2
+            many_artists[name].set_data(*lod_trail(trajectory.x, trajectory.y, many_lod[name], i))
+            if f"{name}_head" in many_artists:
+                many_artists[f"{name}_head"].set_data([trajectory.x[i]], [trajectory.y[i]])
+        many_fig.savefig(io.BytesIO(), format="png")
+
+    plotly_trajectories = [{"name": "primary", "t": long_run.t, "x": long_run.x, "y": long_run.y,
+                            "color": "black", "dash": "solid", "marker": {"color": "red"}}]
+
+    # The whole browser-side animation: figure build plus the JSON that goes over the websocket
+    def plotly_animation():
+        figure = build_plotly_animation(plotly_trajectories, long_run.t[-1], long_run.x.max() * 1.1,
+                                        long_run.y.max() * 1.2, "white")
+        return len(figure.to_json())
+
+    many_trajectories = [{"name": name, "t": trajectory.t, "x": trajectory.x, "y": trajectory.y,
+                          "color": "black", "dash": "solid", "marker": {"color": "red"}}
+                         for name, trajectory in many.trajectories.items()]
+
+    def plotly_animation_20_launches():
+        figure = build_plotly_animation(many_trajectories, many.t_max, many.x_max, many.y_max, "white")
+        return len(figure.to_json())
+
+    return {"render/matplotlib_frame": matplotlib_frame, "render/matplotlib_frame_fine_step": matplotlib_frame_fine_step,
+            "render/matplotlib_frame_20_launches": matplotlib_frame_20_launches,
+            "render/plotly_animation": plotly_animation,
+            "render/plotly_animation_20_launches": plotly_animation_20_launches}
+
+
+# peak_kib is None when trace_memory is off
+def measure(func, repeat, trace_memory=True):
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    peak_kib = None
+    if trace_memory:
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_kib = peak / 1024
+    return {"median_ms": statistics.median(timings) * 1e3, "min_ms": min(timings) * 1e3,
+            "peak_kib": peak_kib, "repeat": repeat}
+
+
+# Case builders by name prefix; a builder's setup (solves, figures) only runs when one of its cases is selected
+CASE_GROUPS = {
+    "solver/": _solver_cases,
+    "sweep/": _sweep_cases,
+    "optimize/": _optimizer_cases,
+    "stream/": _stream_cases,
+    "montecarlo/": _montecarlo_cases,
+    "export/": _export_cases,
+    "startup/": _startup_cases,
+    "rerun/": _rerun_cases,
+    "render/": _render_cases,
+}
+
+
+def run(repeat, selected=None):
+    cases = {}
+    for group, build in CASE_GROUPS.items():
+        if not selected or any(prefix.startswith(group) or group.startswith(prefix) for prefix in selected):
+            cases.update(build())
+    results = {}
+    for name, func in cases.items():
+        if selected and not any(name.startswith(prefix) for prefix in selected):
+            continue
+        results[name] = measure(func, repeat, trace_memory=not name.startswith(SUBPROCESS_GROUPS))
+    return results
+
+
+# Cases whose median grew by more than the tolerance over the baseline
+def regressions(results, baseline, tolerance):
+    slower = {}
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference and result["median_ms"] > reference["median_ms"] * (1 + tolerance):
+            slower[name] = result["median_ms"] / reference["median_ms"]
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Projectile simulation benchmarks")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per case")
+    parser.add_argument("--only", nargs="*", help="case name prefixes, e.g. solver/ sweep/ rerun/drag_rk45")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs the baseline")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat, args.only)
+    print(f"{'case':<36}{'median ms':>11}{'min ms':>10}{'peak KiB':>11}")
+    for name, result in results.items():
+        peak = "-" if result["peak_kib"] is None else f"{result['peak_kib']:.1f}"
+        print(f"{name:<36}{result['median_ms']:>11.3f}{result['min_ms']:>10.3f}{peak:>11}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"machine": {"python": platform.python_version(), "numpy": np.__version__,
+                                   "platform": platform.platform()},
+                       "results": results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        slower = regressions(results, baseline, args.tolerance)
+        for name, ratio in slower.items():
+            print(f"REGRESSION {name}: {ratio:.2f}x the baseline median")
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
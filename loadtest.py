@@ -0,0 +1,229 @@
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# ================= Multi-Session Load Test =================
+# A class hitting the page at once, simulated in one process with Streamlit's AppTest:
+#   python loadtest.py                                # 20 sessions, 3 rounds, browser playback
+#   python loadtest.py --sessions 40 --mode server    # server playback sleeps in real time, so rounds take longer
+#   python loadtest.py --json load.json               # also save the report
+# Every session is one AppTest with its own thread, and they share the process-wide caches, the question bank
+# and the process pool like sessions of one server do. AppTest swaps process-wide state around each run (the
+# runtime singleton, config patches, a fresh compile of the page), so runs are queued on one lock: sessions act
+# at the same moment, and a session's latency includes waiting behind the rest of the class, as on a server
+# whose script threads share one GIL. The time of the run alone is reported as service time.
+# A single visitor goes first, so the one-off imports and cache fills are reported on their own. Then every
+# round, all sessions click Start and answer one quiz question (pick the answer, Check, Next) together. The
+# report gives latency percentiles per action, the rerun timing spans the page recorded (PROJECTILE_DEBUG=1)
+# and the process RSS after every round. Sessions that keep growing from round to round are a leak: the run
+# fails (exit 1) when RSS grows by more than --max-rss-growth MiB per session per round.
+# AppTest always runs the whole script, so a quiz click costs a full rerun here rather than a fragment rerun.
+
+PAGE = Path(__file__).with_name("6514854.py")
+RUN_LOCK = threading.Lock()
+QUESTIONS = [{"question": f"Load test question {k + 1}", "options": ["A", "B", "C", "D"], "correct_index": k % 4}
+             for k in range(10)]
+
+
+# Resident size after a full collection, so reference cycles left by the last reruns do not count as growth
+def rss_mib():
+    gc.collect()
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024**2
+    except OSError:
+        import resource
+        # Peak rather than current size where /proc is missing (KiB on Linux, bytes on macOS)
+        scale = 1024**2 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {}
+
+    def at(q):
+        return values[min(len(values) - 1, round(q * (len(values) - 1)))] * 1e3
+
+    return {"count": len(values), "p50_ms": at(0.5), "p90_ms": at(0.9), "p99_ms": at(0.99),
+            "max_ms": values[-1] * 1e3, "mean_ms": statistics.fmean(values) * 1e3}
+
+
+class Session:
+    def __init__(self, timeout, mode):
+        from streamlit.testing.v1 import AppTest
+
+        self.app = AppTest.from_file(str(PAGE), default_timeout=timeout)
+        self.mode = mode
+        self.latencies = {}
+        self.service = {}
+        self.errors = []
+
+    def _timed(self, action, step):
+        start = time.perf_counter()
+        with RUN_LOCK:
+            began = time.perf_counter()
+            step()
+        end = time.perf_counter()
+        self.latencies.setdefault(action, []).append(end - start)
+        self.service.setdefault(action, []).append(end - began)
+        if self.app.exception:
+            self.errors.append(f"{action}: {self.app.exception[0].message}")
+
+    # The widget with this label, or None (recorded as an error) when the last run did not draw it
+    def _widget(self, widgets, *labels):
+        widget = next((widget for widget in widgets if widget.label in labels), None)
+        if widget is None:
+            self.errors.append(f"no widget labelled {' / '.join(labels)}")
+        return widget
+
+    def _click(self, action, *labels):
+        button = self._widget(self.app.button, *labels)
+        if button is not None:
+            self._timed(action, lambda: button.click().run())
+        return button is not None
+
+    def open(self):
+        self._timed("open", self.app.run)
+        if self.mode != "browser":
+            self._widget(self.app.radio, "🎞️ Animation Mode").set_value(self.mode)
+            self._timed("settings", self.app.run)
+
+    def start(self):
+        self._click("start", "🚀 Start Simulation")
+
+    # Pick the right option of the current question, check it and move on
+    def answer(self):
+        state = self.app.session_state
+        if state["test_completed"]:
+            self._click("restart_test", "🔄 Restart Test")
+        radio = self._widget(self.app.radio, "Choose the answer:")
+        if radio is None:
+            return
+        question = QUESTIONS[state["current_question"]]
+        radio.set_value(question["options"][question["correct_index"]])
+        if self._click("check_answer", "✅ Check Answer"):
+            self._click("next_question", "➡️ Next", "🏁 Finish Test")
+
+    def spans(self):
+        profile = self.app.session_state["rerun_profile"]
+        return [record for record in profile.records if record["kind"] == "rerun"]
+
+
+# All sessions run step(session) at once; returns the wall time of the slowest
+def _together(sessions, step):
+    barrier = threading.Barrier(len(sessions))
+
+    def run(session):
+        barrier.wait()
+        step(session)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(sessions)) as executor:
+        list(executor.map(run, sessions))
+    return time.perf_counter() - start
+
+
+def run(sessions, rounds, mode, timeout):
+    from question_store import QuestionStore
+
+    QuestionStore(os.environ["PROJECTILE_QUESTION_DB"]).add_many(QUESTIONS)
+    memory = [{"stage": "before", "rss_mib": rss_mib()}]
+    # One visitor first: it pays the lazy library imports, which are not safe to race across threads
+    warmup = Session(timeout, mode)
+    warmup.open()
+    warmup.start()
+    memory.append({"stage": "warm", "rss_mib": rss_mib()})
+    clients = [Session(timeout, mode) for _ in range(sessions)]
+    wall = {"open": _together(clients, Session.open)}
+    memory.append({"stage": "opened", "rss_mib": rss_mib()})
+    for round_number in range(1, rounds + 1):
+        wall[f"round_{round_number}"] = _together(clients, lambda session: (session.start(), session.answer()))
+        memory.append({"stage": f"round_{round_number}", "rss_mib": rss_mib()})
+
+    latencies = {}
+    service = {}
+    span_ms = {}
+    for client in clients:
+        for action, values in client.latencies.items():
+            latencies.setdefault(action, []).extend(values)
+        for action, values in client.service.items():
+            service.setdefault(action, []).extend(values)
+        for record in client.spans():
+            for name, span in record["spans"].items():
+                span_ms.setdefault(name, []).append(span["ms"] / 1e3)
+    rounds_rss = [entry["rss_mib"] for entry in memory[3:]]
+    return {
+        "sessions": sessions, "rounds": rounds, "mode": mode,
+        "cold": {action: values[0] * 1e3 for action, values in warmup.latencies.items()},
+        "latency": {action: percentiles(values) for action, values in latencies.items()},
+        "service": {action: percentiles(values) for action, values in service.items()},
+        "spans": {name: percentiles(values) for name, values in sorted(span_ms.items())},
+        "wall_s": wall,
+        "memory": memory,
+        # Growth from the first round to the last: what a session keeps per extra round
+        "rss_growth_per_round_mib": (rounds_rss[-1] - rounds_rss[0]) / (len(rounds_rss) - 1)
+                                    if len(rounds_rss) > 1 else None,
+        "errors": [error for client in [warmup, *clients] for error in client.errors],
+    }
+
+
+def _print_table(title, rows):
+    print(f"\n{title:<24}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, row in rows.items():
+        print(f"{name:<24}{row['count']:>7}{row['p50_ms']:>10.1f}{row['p90_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+              f"{row['max_ms']:>10.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate many sessions using the projectile page at once")
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent sessions")
+    parser.add_argument("--rounds", type=int, default=3, help="Start + answer rounds per session")
+    parser.add_argument("--mode", choices=["browser", "server"], default="browser", help="animation mode")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds one rerun may take")
+    parser.add_argument("--max-rss-growth", type=float, default=1.0,
+                        help="MiB of RSS growth per session per round that fails the run")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        # A throwaway question bank, and timing spans on in every session
+        os.environ["PROJECTILE_QUESTION_DB"] = os.path.join(directory, "questions.db")
+        os.environ["PROJECTILE_DEBUG"] = "1"
+        report = run(args.sessions, args.rounds, args.mode, args.timeout)
+
+    print(f"{report['sessions']} sessions x {report['rounds']} rounds, {report['mode']} playback")
+    print("first visitor: " + ", ".join(f"{action} {ms:.0f} ms" for action, ms in report["cold"].items()))
+    _print_table("latency", report["latency"])
+    _print_table("service time", report["service"])
+    _print_table("rerun span", report["spans"])
+    print("\nwall time: " + ", ".join(f"{stage} {seconds:.1f} s" for stage, seconds in report["wall_s"].items()))
+    print("memory:    " + ", ".join(f"{entry['stage']} {entry['rss_mib']:.0f} MiB" for entry in report["memory"]))
+    growth = report["rss_growth_per_round_mib"]
+    leaking = False
+    if growth is not None:
+        per_session = growth / report["sessions"]
+        leaking = per_session > args.max_rss_growth
+        print(f"RSS growth per round: {growth:.1f} MiB ({per_session:.2f} MiB per session)")
+        if leaking:
+            print(f"LEAK RSS grew {per_session:.2f} MiB per session per round, over {args.max_rss_growth:g} MiB")
+    for error in report["errors"]:
+        print(f"ERROR {error}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["errors"] or leaking else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
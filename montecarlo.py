@@ -0,0 +1,189 @@
+import math
+import multiprocessing
+import os
+import sys
+import time
+from statistics import NormalDist
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from simulation import DRAG_COEFFICIENT, G, integrate_drag_summary, summary_no_air
+
+# ================= Monte Carlo Uncertainty =================
+# Launch uncertainty by sampling: v0, angle, h0 and the drag coefficient c are drawn from normal distributions and
+# every sample is flown with the summary integrators, so only flight time, range and apex height are kept.
+# Samples are split into fixed batches. Each batch draws from its own seeded generator, so the results do not
+# depend on how many workers ran them. Workers write their batch straight into one shared-memory block, and only
+# the batch number travels back through the pool.
+
+MONTE_CARLO_METRICS = {"range": "Landing Distance (m)", "max_height": "Apex Height (m)",
+                       "flight_time": "Flight Time (s)"}
+# Rows of the shared result block, in this order
+_COLUMNS = ("flight_time", "range", "max_height")
+# About 0.1-0.3 s of drag integration per batch: small enough for smooth progress and prompt cancelling,
+# large enough that the NumPy passes over the batch dominate
+BATCH_SAMPLES = 16384
+
+
+# Nominal value and standard deviation of each uncertain input; samples are clipped to the physical range
+@dataclass(frozen=True)
+class UncertaintyConfig:
+    v0: float = 50.0
+    v0_sd: float = 1.0
+    angle: float = 45.0
+    angle_sd: float = 1.0
+    h0: float = 0.0
+    h0_sd: float = 0.0
+    c: float = DRAG_COEFFICIENT
+    c_sd: float = 0.0005
+    drag: bool = True
+    samples: int = 100_000
+    seed: int = 0
+    g: float = G
+    dt: float = 0.01
+
+    @property
+    def batches(self):
+        return math.ceil(self.samples / BATCH_SAMPLES)
+
+
+def sample_inputs(config, rng, n):
+    v0 = np.maximum(rng.normal(config.v0, config.v0_sd, n), 0.0)
+    angle = np.clip(rng.normal(config.angle, config.angle_sd, n), 0.0, 90.0)
+    h0 = np.maximum(rng.normal(config.h0, config.h0_sd, n), 0.0)
+    c = np.maximum(rng.normal(config.c, config.c_sd, n), 0.0)
+    return v0, angle, h0, c
+
+
+# Samples of one batch: its generator is seeded by (seed, batch), so any worker draws the same numbers
+def _batch_outcomes(config, batch):
+    start = batch * BATCH_SAMPLES
+    n = min(BATCH_SAMPLES, config.samples - start)
+    v0, angle, h0, c = sample_inputs(config, np.random.default_rng([config.seed, batch]), n)
+    theta = np.radians(angle)
+    if config.drag:
+        return start, integrate_drag_summary(v0, theta, h0, config.g, c, config.dt)
+    return start, summary_no_air(v0, theta, h0, config.g)
+
+
+# Worker side: attach to the result block by name and fill in one batch
+def _run_batch(shm_name, config, batch):
+    # Pool workers share the parent's resource tracker, so attaching does not take ownership of the block
+    shm = SharedMemory(name=shm_name)
+    try:
+        start, outcomes = _batch_outcomes(config, batch)
+        _write_batch(shm, config, start, outcomes)
+    finally:
+        shm.close()
+    return batch
+
+
+def _write_batch(shm, config, start, outcomes):
+    results = np.ndarray((len(_COLUMNS), config.samples), dtype=np.float64, buffer=shm.buf)
+    for row, values in zip(results, outcomes):
+        row[start:start + len(values)] = values
+
+
+def _ready():
+    return os.getpid()
+
+
+# Pool for run_monte_carlo, one worker per core. forkserver workers start from a clean process, not a copy of a
+# threaded server (spawn is the fallback where forkserver does not exist). A starting worker re-imports the
+# parent's __main__, which under Streamlit is the page script, so all workers are started here with this module
+# standing in for it; the fork server preloads it too, so workers begin with NumPy and the integrators imported.
+def process_pool(workers=None):
+    workers = workers or os.cpu_count()
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+    else:
+        context = multiprocessing.get_context("spawn")
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    main = sys.modules["__main__"]
+    sys.modules["__main__"] = sys.modules[__name__]
+    try:
+        # Tasks submitted while no worker is idle each start one more, up to max_workers
+        wait([executor.submit(_ready) for _ in range(workers)])
+    finally:
+        sys.modules["__main__"] = main
+    return executor
+
+
+@dataclass
+class MonteCarloResult:
+    config: UncertaintyConfig
+    outcomes: dict        # metric -> 1-D array over the completed samples
+    completed: int
+    cancelled: bool = False
+    elapsed: float = 0.0
+
+    # Mean with its confidence interval, and the central interval that holds `level` of the outcomes
+    def summary(self, metric, level=0.95):
+        values = self.outcomes[metric]
+        if values.size == 0:
+            return None
+        mean = float(values.mean())
+        std = float(values.std(ddof=1)) if values.size > 1 else 0.0
+        z = NormalDist().inv_cdf((1 + level) / 2)
+        half_width = z * std / math.sqrt(values.size)
+        tail = (1 - level) / 2 * 100
+        low, high = np.percentile(values, [tail, 100 - tail])
+        return {"mean": mean, "std": std, "mean_ci": (mean - half_width, mean + half_width),
+                "interval": (float(low), float(high)), "level": level}
+
+    def histogram(self, metric, bins=60):
+        return np.histogram(self.outcomes[metric], bins=bins)
+
+
+# Fly config.samples sampled launches. Batches run on the executor (inline when it is None), and
+# progress(done, total) is called as batches finish. Cancelling:
+#   - cancelled() returning True stops waiting.
+#   - So does any exception raised from progress, e.g. Streamlit stopping the script for a rerun.
+#   - Batches not yet started are dropped.
+#   - On a True from cancelled(), the result covers the batches that finished.
+def run_monte_carlo(config, executor=None, progress=None, cancelled=None):
+    start_time = time.perf_counter()
+    total = config.batches
+    done = []
+    shm = SharedMemory(create=True, size=max(1, len(_COLUMNS) * config.samples * 8))
+    futures = set()
+    stopped = False
+    try:
+        if executor is None:
+            for batch in range(total):
+                if cancelled is not None and cancelled():
+                    stopped = True
+                    break
+                start, outcomes = _batch_outcomes(config, batch)
+                _write_batch(shm, config, start, outcomes)
+                done.append(batch)
+                if progress is not None:
+                    progress(len(done), total)
+        else:
+            futures = {executor.submit(_run_batch, shm.name, config, batch) for batch in range(total)}
+            while futures:
+                finished, futures = wait(futures, timeout=0.1, return_when=FIRST_COMPLETED)
+                done.extend(future.result() for future in finished)
+                if finished and progress is not None:
+                    progress(len(done), total)
+                if cancelled is not None and cancelled():
+                    stopped = True
+                    break
+
+        # Copy out the finished batches only; they are contiguous index ranges of the block
+        rows = np.concatenate([np.arange(batch * BATCH_SAMPLES, min((batch + 1) * BATCH_SAMPLES, config.samples))
+                               for batch in sorted(done)] or [np.array([], dtype=int)])
+        results = np.ndarray((len(_COLUMNS), config.samples), dtype=np.float64, buffer=shm.buf)
+        outcomes = {name: results[k, rows] for k, name in enumerate(_COLUMNS)}
+        del results
+    finally:
+        for future in futures:
+            future.cancel()
+        shm.close()
+        shm.unlink()
+    return MonteCarloResult(config, outcomes, completed=len(rows), cancelled=stopped,
+                            elapsed=time.perf_counter() - start_time)
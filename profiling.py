@@ -0,0 +1,101 @@
+import functools
+import json
+import time
+from collections import deque
+from contextlib import nullcontext
+
+# ================= Rerun Timing Spans =================
+# Wall-clock totals per stage of a rerun (physics, playback lookups, rendering, sleeping, quiz, ...).
+# A disabled profile hands out one shared no-op context, so instrumented code costs next to nothing
+# when debugging is off. Every rerun is one record:
+#   {"kind", "started" (epoch s), "total_ms", "spans": {name: {"ms", "calls"}}}
+# Records are kept in a bounded history for the side panel and the JSON export.
+
+_NO_SPAN = nullcontext()
+
+
+class _Span:
+    __slots__ = ("record", "name", "start")
+
+    def __init__(self, record, name):
+        self.record = record
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        add_span(self.record, self.name, time.perf_counter() - self.start)
+        return False
+
+
+def add_span(record, name, seconds):
+    span = record["spans"].setdefault(name, {"ms": 0.0, "calls": 0})
+    span["ms"] += seconds * 1e3
+    span["calls"] += 1
+
+
+class RerunProfile:
+    def __init__(self, enabled=True, history=100):
+        self.enabled = enabled
+        self.records = deque(maxlen=history)
+        self.current = None
+        self._start = None
+
+    # Open the record of a new rerun; spans go to it until the next start
+    def start(self, kind="rerun"):
+        self.current = {"kind": kind, "started": time.time(), "total_ms": 0.0, "spans": {}}
+        self._start = time.perf_counter()
+        if self.enabled:
+            self.records.append(self.current)
+
+    @property
+    def running(self):
+        return self._start is not None
+
+    def span(self, name):
+        if not self.enabled or self.current is None:
+            return _NO_SPAN
+        return _Span(self.current, name)
+
+    # Time spent outside a with-block, e.g. the sleeps a frame scheduler measured itself
+    def add(self, name, seconds):
+        if self.enabled and self.current is not None:
+            add_span(self.current, name, seconds)
+
+    # Close the current record's total
+    def finish(self):
+        if self.running:
+            self.current["total_ms"] = (time.perf_counter() - self._start) * 1e3
+            self._start = None
+        return self.current
+
+    # Decorator for code that also runs on its own, like a Streamlit fragment: inside a rerun it is one
+    # more span, on its own it gets a record of the given kind
+    def timed(self, name, kind="fragment"):
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if self.running:
+                    with self.span(name):
+                        return func(*args, **kwargs)
+                self.start(kind)
+                try:
+                    with self.span(name):
+                        return func(*args, **kwargs)
+                finally:
+                    self.finish()
+            return wrapper
+        return decorate
+
+    # Spans of one record, slowest first, as table rows
+    @staticmethod
+    def rows(record):
+        total = record["total_ms"] or 1.0
+        return [{"span": name, "ms": round(span["ms"], 2), "calls": span["calls"],
+                 "share": f"{span['ms'] / total:.0%}"}
+                for name, span in sorted(record["spans"].items(), key=lambda item: -item[1]["ms"])]
+
+    def to_json(self):
+        return json.dumps({"records": list(self.records)}, indent=2)
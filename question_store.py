@@ -0,0 +1,237 @@
+import csv
+import io
+import json
+import sqlite3
+import threading
+import time
+
+# ================= Shared Question Bank =================
+# Process-wide question store backed by a local SQLite file. Rows are mirrored in memory
+# (id -> question dict plus the id order), so lookups by ID and page slices never touch the disk.
+# Every change bumps a store-wide revision; readers reload the mirror when the revision in the
+# file moved, which also picks up edits made by other processes (e.g. an import script).
+
+OPTION_COUNT = 4
+CSV_FIELDS = ["question", "option_1", "option_2", "option_3", "option_4", "correct_option"]
+
+
+# Raised when an edit is based on an older version of the question than the stored one
+class StaleEditError(Exception):
+    pass
+
+
+# Normalize one question record; correct_index is 0-based like the rest of the app. Values are not coerced:
+# the text and options must be strings and correct_index an integer, so e.g. a JSON null is not stored as "None"
+def validate_question(question, options, correct_index):
+    if not isinstance(question, str):
+        raise ValueError("Question text must be a string")
+    if not isinstance(options, (list, tuple)) or not all(isinstance(option, str) for option in options):
+        raise ValueError(f"Options must be a list of {OPTION_COUNT} strings")
+    if not isinstance(correct_index, int) or isinstance(correct_index, bool):
+        raise ValueError("Correct option must be an integer")
+    question = question.strip()
+    options = [option.strip() for option in options]
+    if not question:
+        raise ValueError("Question text is empty")
+    if len(options) != OPTION_COUNT or not all(options):
+        raise ValueError(f"A question needs {OPTION_COUNT} non-empty options")
+    if not 0 <= correct_index < OPTION_COUNT:
+        raise ValueError(f"Correct option must be between 1 and {OPTION_COUNT}")
+    return question, options, correct_index
+
+
+class QuestionStore:
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        if self.path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS questions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                question TEXT NOT NULL,
+                options TEXT NOT NULL,
+                correct_index INTEGER NOT NULL,
+                version INTEGER NOT NULL DEFAULT 1,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            INSERT OR IGNORE INTO meta (key, value) VALUES ('revision', 0);
+        """)
+        self._questions = {}
+        self._order = []
+        self._revision = None
+        with self._lock:
+            self._sync()
+
+    # ---------- Internal ----------
+    def _db_revision(self):
+        return self._conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+
+    # Reload the in-memory mirror if the file changed since the last read (caller holds the lock)
+    def _sync(self):
+        revision = self._db_revision()
+        if revision == self._revision:
+            return
+        rows = self._conn.execute(
+            "SELECT id, question, options, correct_index, version FROM questions ORDER BY id").fetchall()
+        self._questions = {
+            row[0]: {"id": row[0], "question": row[1], "options": json.loads(row[2]),
+                     "correct_index": row[3], "version": row[4]}
+            for row in rows
+        }
+        self._order = [row[0] for row in rows]
+        self._revision = revision
+
+    # Run statements in one transaction and bump the revision (caller holds the lock). check(results), when
+    # given, runs before the commit; an exception from it rolls the transaction back.
+    def _write(self, statements, check=None):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            results = [self._conn.execute(sql, params) for sql, params in statements]
+            if check is not None:
+                check(results)
+            self._conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._sync()
+        return results
+
+    # ---------- Reads ----------
+    @property
+    def revision(self):
+        with self._lock:
+            self._sync()
+            return self._revision
+
+    def count(self):
+        with self._lock:
+            self._sync()
+            return len(self._order)
+
+    def ids(self):
+        with self._lock:
+            self._sync()
+            return list(self._order)
+
+    def get(self, question_id):
+        with self._lock:
+            self._sync()
+            question = self._questions.get(question_id)
+            return None if question is None else dict(question, options=list(question["options"]))
+
+    # Questions on one page, in insertion order (page is 0-based)
+    def page(self, page, page_size):
+        with self._lock:
+            self._sync()
+            page_ids = self._order[page * page_size:(page + 1) * page_size]
+            return [dict(self._questions[qid], options=list(self._questions[qid]["options"])) for qid in page_ids]
+
+    def all(self):
+        with self._lock:
+            self._sync()
+            return [dict(self._questions[qid], options=list(self._questions[qid]["options"])) for qid in self._order]
+
+    # ---------- Writes ----------
+    def add(self, question, options, correct_index):
+        question, options, correct_index = validate_question(question, options, correct_index)
+        with self._lock:
+            cursor, = self._write([(
+                "INSERT INTO questions (question, options, correct_index, updated_at) VALUES (?, ?, ?, ?)",
+                (question, json.dumps(options), correct_index, time.time()))])
+            return cursor.lastrowid
+
+    # Optimistic edit: pass the version the edit started from to reject edits of a changed question. The version
+    # is compared by the UPDATE itself, so an edit committed by another process in between is never overwritten.
+    def update(self, question_id, question, options, correct_index, version=None):
+        question, options, correct_index = validate_question(question, options, correct_index)
+        sql = ("UPDATE questions SET question = ?, options = ?, correct_index = ?, version = version + 1, "
+               "updated_at = ? WHERE id = ?")
+        params = (question, json.dumps(options), correct_index, time.time(), question_id)
+        if version is not None:
+            sql += " AND version = ?"
+            params += (version,)
+
+        def check(results):
+            if results[0].rowcount:
+                return
+            row = self._conn.execute("SELECT version FROM questions WHERE id = ?", (question_id,)).fetchone()
+            if row is None:
+                raise KeyError(question_id)
+            raise StaleEditError(f"Question {question_id} was changed (version {row[0]})")
+
+        with self._lock:
+            self._write([(sql, params)], check)
+            return self._questions[question_id]["version"]
+
+    def delete(self, question_id):
+        with self._lock:
+            self._write([("DELETE FROM questions WHERE id = ?", (question_id,))])
+
+    def clear(self):
+        with self._lock:
+            self._write([("DELETE FROM questions", ())])
+
+    # All records are validated first and inserted in a single transaction
+    def add_many(self, records):
+        rows = []
+        now = time.time()
+        for number, record in enumerate(records, 1):
+            if not isinstance(record, dict):
+                raise ValueError(f"Question {number}: expected an object with question, options and correct_index")
+            try:
+                question, options, correct_index = validate_question(
+                    record["question"], record["options"], record["correct_index"])
+            except KeyError as exc:
+                raise ValueError(f"Question {number}: missing {exc}") from exc
+            except ValueError as exc:
+                raise ValueError(f"Question {number}: {exc}") from exc
+            rows.append((question, json.dumps(options), correct_index, now))
+        if not rows:
+            return 0
+        with self._lock:
+            self._write([(
+                "INSERT INTO questions (question, options, correct_index, updated_at) VALUES (?, ?, ?, ?)", row)
+                for row in rows])
+        return len(rows)
+
+    # ---------- Import / Export ----------
+    # JSON is a list of {"question", "options", "correct_index"} objects (0-based correct_index)
+    def export_json(self):
+        return json.dumps([{key: q[key] for key in ("id", "question", "options", "correct_index", "version")}
+                           for q in self.all()], ensure_ascii=False, indent=2)
+
+    def import_json(self, text):
+        records = json.loads(text)
+        if not isinstance(records, list):
+            raise ValueError("Expected a JSON list of questions")
+        return self.add_many(records)
+
+    # CSV uses one column per option and a 1-based correct_option, matching the teacher form
+    def export_csv(self):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_FIELDS)
+        for q in self.all():
+            writer.writerow([q["question"], *q["options"], q["correct_index"] + 1])
+        return buffer.getvalue()
+
+    def import_csv(self, text):
+        reader = csv.DictReader(io.StringIO(text))
+        missing = set(CSV_FIELDS) - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f"CSV is missing columns: {', '.join(sorted(missing))}")
+        records = []
+        for row in reader:
+            # DictReader fills the cells missing from a short row with None
+            try:
+                correct_index = int(row["correct_option"]) - 1
+            except (TypeError, ValueError) as exc:
+                raise ValueError(f"Question {len(records) + 1}: correct_option must be a number") from exc
+            records.append({"question": row["question"] or "",
+                            "options": [row[f"option_{k}"] or "" for k in range(1, OPTION_COUNT + 1)],
+                            "correct_index": correct_index})
+        return self.add_many(records)
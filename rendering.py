@@ -0,0 +1,267 @@
+import base64
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+from matplotlib.figure import Figure
+
+# ================= Rendering =================
+# Streamlit-free drawing and playback helpers: the browser-side Plotly animation, the frame schedule
+# and wall-clock pacing of the server-side loop, and the reusable matplotlib trajectory figure.
+
+# ================= Client-Side Animation (Plotly) =================
+PLOTLY_FRAMES = 120
+# Trails are decimated once (see lod_indices) and then sliced per frame, so the payload stays bounded for long drag runs
+PLOTLY_TRAIL_POINTS = 200
+# Points shared by all trails of one animation, so comparing many launches sends about as much as comparing two
+PLOTLY_PAYLOAD_POINTS = 400
+PLOTLY_MIN_TRAIL_POINTS = 40
+
+# Coordinates as a plotly.js typed array (base64 float32): validated and copied as one string instead of
+# element by element, and about a third of the JSON of decimal text. float32 resolves well below a millimetre.
+def _typed_array(values):
+    return {"dtype": "f4", "bdata": base64.b64encode(np.asarray(values, dtype=np.float32).tobytes()).decode()}
+
+# Whole animation as one figure: the arrays go to the browser once and playback happens there
+def build_plotly_animation(trajectories, t_max, x_max, y_max, bg_color, analysis_point=None, n_frames=PLOTLY_FRAMES):
+    frame_times = np.linspace(0, t_max, n_frames)
+    traces = []
+    frames = [{"name": f"{t_frame:.2f}", "data": []} for t_frame in frame_times]
+    trail_points = max(PLOTLY_MIN_TRAIL_POINTS, min(PLOTLY_TRAIL_POINTS, PLOTLY_PAYLOAD_POINTS // len(trajectories)))
+
+    heads = []
+    for trajectory in trajectories:
+        t, x, y = trajectory["t"], trajectory["x"], trajectory["y"]
+        keep = lod_indices(y, trail_points)
+        x_keep, y_keep = x[keep], y[keep]
+        trail_end = np.searchsorted(t[keep], frame_times, side="right")
+        head = np.minimum(np.searchsorted(t, frame_times), len(t) - 1)
+        line = {"color": trajectory["color"], "dash": trajectory["dash"]}
+
+        traces.append({"type": "scatter", "mode": "lines", "name": trajectory["name"], "line": line,
+                       "x": x[:1], "y": y[:1]})
+        for frame, n, k in zip(frames, trail_end, head):
+            frame["data"].append({"type": "scatter", "x": _typed_array(np.r_[x_keep[:n], x[k]]),
+                                  "y": _typed_array(np.r_[y_keep[:n], y[k]])})
+        if trajectory.get("marker"):
+            heads.append((trajectory, head))
+
+    # All moving heads share one markers trace with per-point styles, so a frame has one trace per trail plus one
+    if heads:
+        head_frames = []
+        for f, t_frame in enumerate(frame_times):
+            flying = [(trajectory, head[f]) for trajectory, head in heads if t_frame < trajectory["t"][-1]]
+            markers = [trajectory["marker"] for trajectory, _ in flying]
+            head_frames.append({"type": "scatter", "x": [trajectory["x"][k] for trajectory, k in flying],
+                                "y": [trajectory["y"][k] for trajectory, k in flying],
+                                "marker": {"color": [marker["color"] for marker in markers],
+                                           "symbol": [marker.get("symbol", "circle") for marker in markers],
+                                           "size": [marker.get("size", 6) for marker in markers]}})
+        traces.append({"mode": "markers", "showlegend": False, "hoverinfo": "skip", **head_frames[0]})
+        for frame, head_frame in zip(frames, head_frames):
+            frame["data"].append(head_frame)
+
+    if analysis_point is not None:
+        traces.append({"type": "scatter", "mode": "markers", "name": analysis_point["name"],
+                       "marker": {"color": "green", "symbol": "square", "size": 12},
+                       "x": [analysis_point["x"]], "y": [analysis_point["y"]]})
+
+    for frame in frames:
+        frame["traces"] = list(range(len(frame["data"])))
+
+    frame_ms = max(20, int(1000 * t_max / n_frames))
+    play = {"frame": {"duration": frame_ms, "redraw": False}, "transition": {"duration": 0},
+            "fromcurrent": True, "mode": "immediate"}
+    jump = {"frame": {"duration": 0, "redraw": False}, "transition": {"duration": 0}, "mode": "immediate"}
+    layout = {
+        "title": {"text": "The Projectile Motion Trajectory"},
+        "xaxis": {"range": [0, x_max], "title": {"text": "Range (m)"}, "showgrid": True},
+        "yaxis": {"range": [0, y_max], "title": {"text": "Height (m)"}, "showgrid": True},
+        "paper_bgcolor": bg_color,
+        "plot_bgcolor": "white",
+        "updatemenus": [{"type": "buttons", "showactive": False, "x": 0, "y": -0.15, "xanchor": "left",
+                         "buttons": [{"label": "▶ Play", "method": "animate", "args": [None, play]},
+                                     {"label": "⏸ Pause", "method": "animate", "args": [[None], jump]}]}],
+        "sliders": [{"x": 0.2, "len": 0.8, "y": -0.05, "currentvalue": {"prefix": "t = ", "suffix": " s"},
+                     "steps": [{"label": frame["name"], "method": "animate", "args": [[frame["name"]], jump]}
+                               for frame in frames]}],
+    }
+    return go.Figure({"data": traces, "layout": layout, "frames": frames}, skip_invalid=True)
+
+# ================= Level of Detail =================
+# Vertex budget of a server-drawn trail: about one point per horizontal pixel of the ~700 px plot
+LOD_POINTS = 700
+
+# Shape-preserving decimation by min/max bucketing: the samples are split into equal index buckets and each
+# bucket keeps its lowest and highest point; launch, apex, impact and the last sample are always kept.
+# Returns sorted sample indices, so the full-resolution arrays stay the source of every number shown.
+def lod_indices(y_points, max_points=LOD_POINTS):
+    n = len(y_points)
+    if n <= max_points:
+        return np.arange(n)
+    anchors = np.array([0, int(np.argmax(y_points)), ground_index(y_points), n - 1])
+    n_buckets = max(1, (max_points - len(anchors)) // 2)
+    size = -(-n // n_buckets)
+    buckets = np.pad(y_points, (0, n_buckets * size - n), mode="edge").reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    extremes = np.r_[offsets + buckets.argmin(axis=1), offsets + buckets.argmax(axis=1)]
+    return np.unique(np.r_[anchors, np.minimum(extremes, n - 1)])
+
+# Trail up to sample i from the decimated samples, always ending exactly on sample i
+def lod_trail(x_points, y_points, keep, i):
+    idx = np.append(keep[:np.searchsorted(keep, i)], i)
+    return x_points[idx], y_points[idx]
+
+# ================= Parameter Sweep Heatmap =================
+# One height slice of a sweep() result: angle on x, launch speed on y, the metric as colour with contour lines
+def build_sweep_heatmap(result, metric, metric_label, height_index=0):
+    values = np.round(result[metric][height_index], 3)
+    contours = {"coloring": "heatmap", "showlabels": True, "labelfont": {"color": "white"}}
+    drag = "with Air Resistance" if result["drag"] else "without Air Resistance"
+    layout = {
+        "title": {"text": f"{metric_label} at h₀ = {result['h0'][height_index]:.1f} m ({drag})"},
+        "xaxis": {"title": {"text": "Launch Angle (°)"}},
+        "yaxis": {"title": {"text": "Initial Velocity (m/s)"}},
+    }
+    trace = {"type": "contour", "x": result["angle"], "y": result["v0"], "z": values, "colorscale": "Viridis",
+             "contours": contours, "colorbar": {"title": {"text": metric_label}},
+             "hovertemplate": "θ = %{x:.1f}°<br>v₀ = %{y:.1f} m/s<br>" + metric_label + " = %{z:.2f}<extra></extra>"}
+    return go.Figure({"data": [trace], "layout": layout})
+
+# ================= Monte Carlo Histogram =================
+# Outcome histogram with the mean (solid) and the central interval holding `level` of the samples (dashed)
+def build_histogram(counts, edges, metric_label, summary):
+    centers = (edges[:-1] + edges[1:]) / 2
+    trace = {"type": "bar", "x": centers, "y": counts, "width": np.diff(edges), "marker": {"color": "#2E86C1"},
+             "hovertemplate": metric_label + " ≈ %{x:.2f}<br>%{y} samples<extra></extra>"}
+    low, high = summary["interval"]
+    markers = [(summary["mean"], "solid"), (low, "dash"), (high, "dash")]
+    layout = {
+        "title": {"text": f"{metric_label}: {summary['level']:.0%} of samples between {low:.2f} and {high:.2f}"},
+        "xaxis": {"title": {"text": metric_label}},
+        "yaxis": {"title": {"text": "Samples"}},
+        "bargap": 0,
+        "shapes": [{"type": "line", "xref": "x", "yref": "paper", "x0": x, "x1": x, "y0": 0, "y1": 1,
+                    "line": {"color": "red", "dash": dash, "width": 2}} for x, dash in markers],
+    }
+    return go.Figure({"data": [trace], "layout": layout})
+
+# ================= Frame Schedule =================
+# Nearest sample for every frame time at once; same choice as argmin(|t_points - t|), ties go left
+def nearest_sample_indices(t_points, frame_times):
+    idx = np.clip(np.searchsorted(t_points, frame_times), 1, len(t_points) - 1)
+    left_closer = (frame_times - t_points[idx - 1]) <= (t_points[idx] - frame_times)
+    return idx - left_closer
+
+# First sample after launch that touches the ground (the last one if it never does)
+def ground_index(y_points):
+    on_ground = y_points[1:] <= 0
+    return 1 + int(np.argmax(on_ground)) if on_ground.any() else len(y_points) - 1
+
+# Playback position of one trajectory whose samples may still be arriving (a stream): the nearest sample at each
+# frame time and whether it has landed. A trajectory lands when its sample reaches the ground (past the launch
+# samples) or its flight time is over; from then on it stays on its ground sample. Only samples that arrived
+# since the last frame are searched for the ground, so a frame costs a binary search plus the new samples,
+# however long the flight.
+class PlaybackCursor:
+    __slots__ = ("sample", "landed", "ground", "scanned")
+
+    def __init__(self):
+        self.sample = 0
+        self.landed = False
+        # First sample after launch on the ground, once one has arrived
+        self.ground = None
+        self.scanned = 1
+
+    # Frame times must not decrease, and the samples must reach frame_time unless the flight is complete
+    def advance(self, t_points, y_points, frame_time):
+        if self.landed:
+            return self.sample
+        n = len(t_points)
+        if self.ground is None and n > self.scanned:
+            hits = np.flatnonzero(y_points[self.scanned:] <= 0)
+            if hits.size:
+                self.ground = self.scanned + int(hits[0])
+            self.scanned = n
+        idx = int(nearest_sample_indices(t_points, frame_time)) if n > 1 else 0
+        if frame_time > t_points[-1] or (y_points[idx] <= 0 and idx > 5):
+            self.landed = True
+            idx = n - 1 if self.ground is None else self.ground
+        self.sample = idx
+        return idx
+
+# Wall-clock pacing: frame k is due k / fps seconds after the start. When rendering falls behind,
+# the frames that are already overdue are dropped so simulated time keeps pace with wall time.
+# Without n_frames the frames go on until the caller stops, e.g. when a flight of unknown length has landed.
+class FrameScheduler:
+    def __init__(self, n_frames, fps):
+        self.n_frames = n_frames
+        self.fps = fps
+        self.rendered = 0
+        self.dropped = 0
+        # Seconds spent waiting for frames to come due
+        self.slept = 0.0
+
+    def __iter__(self):
+        start = time.perf_counter()
+        k = 0
+        while self.n_frames is None or k < self.n_frames:
+            now = time.perf_counter()
+            due = start + k / self.fps
+            if now < due:
+                time.sleep(due - now)
+                self.slept += time.perf_counter() - now
+            else:
+                # Jump to the newest frame that is already due; the final frame is never dropped
+                latest = int((now - start) * self.fps)
+                if self.n_frames is not None:
+                    latest = min(self.n_frames - 1, latest)
+                self.dropped += latest - k
+                k = latest
+            self.rendered += 1
+            yield k
+            k += 1
+
+# ================= Comparison Launches =================
+# Extra launches ("launch_1", "launch_2", ...) take these colours in turn, in both renderers
+COMPARISON_COLORS = ("#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+                     "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf")
+
+def comparison_color(name):
+    return COMPARISON_COLORS[(int(name.rsplit("_", 1)[1]) - 1) % len(COMPARISON_COLORS)]
+
+# ================= Trajectory Figure =================
+# A figure with a fixed set of artists that frames update in place. It is a matplotlib.figure.Figure,
+# so pyplot's global figure manager never holds it and it is freed with its last reference.
+def create_trajectory_figure(trail_color="black"):
+    fig = Figure()
+    ax = fig.subplots()
+    ax.set_xlabel("Range (m)")
+    ax.set_ylabel("Height (m)")
+    ax.set_title("The Projectile Motion Trajectory")
+    ax.grid(True)
+    artists = {
+        "primary": ax.plot([], [], color=trail_color)[0],
+        "primary_head": ax.plot([], [], 'ro', markersize=10)[0],
+        "secondary": ax.plot([], [], color='orange', linestyle='--')[0],
+        "secondary_head": ax.plot([], [], 'bs', markersize=8)[0],
+        "no_air": ax.plot([], [], color='blue', linestyle='-')[0],
+        "with_air": ax.plot([], [], color='red', linestyle='--')[0],
+        "analysis": ax.plot([], [], 'gs', markersize=10)[0],
+    }
+    return fig, ax, artists
+
+# Hide every artist, then label and show the trails used by this run and draw the legend once.
+# Comparison launches get a trail and a head the first time a run uses them; later runs reuse those artists.
+def reset_trajectory_figure(ax, artists, labels):
+    for artist in artists.values():
+        artist.set_data([], [])
+        artist.set_visible(False)
+    for name, label in labels.items():
+        if name not in artists:
+            color = comparison_color(name)
+            artists[name] = ax.plot([], [], color=color, linestyle='-.')[0]
+            artists[f"{name}_head"] = ax.plot([], [], 'o', color=color, markersize=7)[0]
+        artists[name].set_label(label)
+        artists[name].set_visible(True)
+    ax.legend(handles=[artists[name] for name in labels], fontsize="small" if len(labels) > 6 else None)
@@ -0,0 +1,986 @@
+import math
+import threading
+from collections import OrderedDict, namedtuple
+from dataclasses import dataclass
+
+import numpy as np
+
+# ================= Headless Simulation Core =================
+# Everything the page computes, with no Streamlit dependency: the projectile models, the shared
+# trajectory cache and simulate(config), which turns one set of page settings into a TrajectorySet.
+
+G = 9.81
+DRAG_COEFFICIENT = 0.005
+NUM_POINTS = 600
+SOLVER_LABELS = {"rk45": "RK45 (adaptive step)", "euler": "Euler (fixed step)"}
+
+
+# Solver name for captions; Euler's step size is that of the configuration it runs with
+def solver_label(solver, dt):
+    return f"{SOLVER_LABELS[solver]}, dt = {dt:g} s" if solver == "euler" else SOLVER_LABELS[solver]
+
+# ================= No-Air Model =================
+# Function to calculate flight time
+def calculate_flight_time(v0, theta_rad, h0, g):
+    return (v0 * np.sin(theta_rad) + np.sqrt((v0*np.sin(theta_rad))**2 + 2*g*h0)) / g
+
+# Flight time, range and apex height of many launches at once; the closed-form counterpart of integrate_drag_summary
+def summary_no_air(v0, theta_rad, h0, g=9.81):
+    flight_time = calculate_flight_time(v0, theta_rad, h0, g)
+    vy0 = np.maximum(v0 * np.sin(theta_rad), 0)
+    return flight_time, v0 * np.cos(theta_rad) * flight_time, h0 + vy0**2 / (2 * g)
+
+# Closed-form trajectory without air resistance
+def compute_projectile_no_air(v0, theta_rad, h0, g=9.81, num_points=600):
+    t_flight = calculate_flight_time(v0, theta_rad, h0, g)
+    t_points = np.linspace(0, t_flight, num=num_points)
+    x_points = v0 * np.cos(theta_rad) * t_points
+    y_points = h0 + v0 * np.sin(theta_rad) * t_points - 0.5 * g * t_points**2
+    y_points = np.maximum(y_points, 0)
+    vx_points = np.full(num_points, v0 * np.cos(theta_rad))
+    vy_points = v0 * np.sin(theta_rad) - g * t_points
+    return t_points, x_points, y_points, vx_points, vy_points
+
+# ================= Air Resistance Model =================
+# Below this many projectiles a plain float loop beats one NumPy call per step
+SCALAR_BATCH_LIMIT = 32
+# The same break-even for RK45 launches, whose steps cost far more per projectile
+RK45_BATCH_LIMIT = 4
+
+# Single projectile from state (x, y, vx, vy), written straight into preallocated x/y/vx/vy columns:
+# the state itself goes to row 0, then one row per step until the first sample below ground or the last row.
+# Returns the rows written and the state of the last one, so a run can be continued in the next columns.
+def _integrate_drag_scalar(state, g, c, dt, x_out, y_out, vx_out, vy_out):
+    x, y, vx, vy = state
+    cdt = c * dt
+    gdt = g * dt
+    x_out[0] = x
+    y_out[0] = y
+    vx_out[0] = vx
+    vy_out[0] = vy
+    k = 0
+    last = len(x_out) - 1
+    while y >= 0 and k < last:
+        k += 1
+        damping = 1.0 - cdt * math.sqrt(vx * vx + vy * vy)
+        vx *= damping
+        vy = vy * damping - gdt
+        x += vx * dt
+        y += vy * dt
+        x_out[k] = x
+        y_out[k] = y
+        vx_out[k] = vx
+        vy_out[k] = vy
+    return k + 1, (x, y, vx, vy)
+
+# Advance many drag trajectories in lockstep (semi-implicit Euler)
+# Returns shared times, (steps, N) x/y/vx/vy buffers and the sample count of each projectile,
+# i.e. up to and including its first sample below ground
+def integrate_drag_batch(v0, theta, h0, g=9.81, c=0.005, dt=0.01, t_end=100):
+    v0, theta, h0, c = np.broadcast_arrays(*(np.atleast_1d(np.asarray(a, dtype=float)) for a in (v0, theta, h0, c)))
+    n = v0.size
+    rows = int(t_end / dt + 1e-9) + 2
+    t_points = np.arange(rows) * dt
+    x_points = np.empty((rows, n))
+    y_points = np.empty((rows, n))
+    vx_points = np.empty((rows, n))
+    vy_points = np.empty((rows, n))
+    n_samples = np.full(n, rows)
+
+    if n < SCALAR_BATCH_LIMIT:
+        for j in range(n):
+            launch = (0.0, float(h0[j]), float(v0[j]) * math.cos(theta[j]), float(v0[j]) * math.sin(theta[j]))
+            n_samples[j], _ = _integrate_drag_scalar(launch, g, float(c[j]), dt, x_points[:, j], y_points[:, j],
+                                                     vx_points[:, j], vy_points[:, j])
+    else:
+        cdt = c * dt
+        gdt = g * dt
+        damping = np.empty(n)
+        below = np.empty(n, dtype=bool)
+        active = np.ones(n, dtype=bool)
+        x_points[0] = 0.0
+        y_points[0] = h0
+        vx_points[0] = v0 * np.cos(theta)
+        vy_points[0] = v0 * np.sin(theta)
+        for k in range(1, rows):
+            vx_k = vx_points[k]
+            vy_k = vy_points[k]
+            np.hypot(vx_points[k - 1], vy_points[k - 1], out=damping)
+            damping *= cdt
+            np.subtract(1.0, damping, out=damping)
+            np.multiply(vx_points[k - 1], damping, out=vx_k)
+            np.multiply(vy_points[k - 1], damping, out=vy_k)
+            vy_k -= gdt
+            x_k = x_points[k]
+            y_k = y_points[k]
+            np.multiply(vx_k, dt, out=x_k)
+            x_k += x_points[k - 1]
+            np.multiply(vy_k, dt, out=y_k)
+            y_k += y_points[k - 1]
+            np.less(y_k, 0, out=below)
+            below &= active
+            if below.any():
+                n_samples[below] = k + 1
+                active &= ~below
+                if not active.any():
+                    break
+
+    used = n_samples.max()
+    return t_points[:used], x_points[:used], y_points[:used], vx_points[:used], vy_points[:used], n_samples
+
+# ---------- Adaptive Dormand-Prince RK45 with dense output ----------
+_DP_A = (
+    (),
+    (1/5,),
+    (3/40, 9/40),
+    (44/45, -56/15, 32/9),
+    (19372/6561, -25360/2187, 64448/6561, -212/729),
+    (9017/3168, -355/33, 46732/5247, 49/176, -5103/18656),
+    (35/384, 0.0, 500/1113, 125/192, -2187/6784, 11/84),
+)
+_DP_E = (-71/57600, 0.0, 71/16695, -71/1920, 17253/339200, -22/525, 1/40)
+# Continuous extension: stage weights as polynomials in the step fraction (theta, theta^2, theta^3, theta^4)
+_DP_P = np.array([
+    [1, -8048581381/2820520608, 8663915743/2820520608, -12715105075/11282082432],
+    [0, 0, 0, 0],
+    [0, 131558114200/32700410799, -68118460800/10900136933, 87487479700/32700410799],
+    [0, -1754552775/470086768, 14199869525/1410260304, -10690763975/1880347072],
+    [0, 127303824393/49829197408, -318862633887/49829197408, 701980252875/199316789632],
+    [0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844],
+    [0, 40617522/29380423, -110615467/29380423, 69997945/29380423],
+])
+
+# State is (x, y, vx, vy)
+def _drag_rhs(state, g, c):
+    vx, vy = state[2], state[3]
+    k = c * math.sqrt(vx * vx + vy * vy)
+    return (vx, vy, -k * vx, -g - k * vy)
+
+# One Dormand-Prince step; the last stage row is the 5th-order solution, so its RHS is reused (FSAL)
+def _dp_step(state, h, k1, g, c):
+    ks = [k1]
+    for row in _DP_A[1:]:
+        stage = tuple(state[m] + h * sum(a * k[m] for a, k in zip(row, ks)) for m in range(4))
+        ks.append(_drag_rhs(stage, g, c))
+    return stage, ks
+
+def _dp_interpolate(state, h, ks, frac, m):
+    q = (frac, frac**2, frac**3, frac**4)
+    return state[m] + h * sum(k[m] * (p[0]*q[0] + p[1]*q[1] + p[2]*q[2] + p[3]*q[3]) for k, p in zip(ks, _DP_P))
+
+# Accepted Dormand-Prince steps (t, h, state, ks) of an adaptive RK45 drag run, yielded as they are taken.
+# The landing time is root-found on the last step's interpolant; the generator returns (t_land, landed, stats).
+def _rk45_steps(v0, theta, h0, g, c, rtol, atol, t_end):
+    state = (0.0, float(h0), v0 * math.cos(theta), v0 * math.sin(theta))
+    k1 = _drag_rhs(state, g, c)
+    nfev = 1
+    n_steps = 0
+    n_rejected = 0
+    t = 0.0
+    # Start at a small fraction of the ballistic time scale; error control takes over from there
+    h = min(1.0, 0.01 * (1.0 + abs(v0)) / g)
+
+    while t < t_end:
+        h = min(h, t_end - t)
+        new_state, ks = _dp_step(state, h, k1, g, c)
+        nfev += 6
+        err_norm = math.sqrt(sum(
+            (h * sum(e * k[m] for e, k in zip(_DP_E, ks)) / (atol + rtol * max(abs(state[m]), abs(new_state[m]))))**2
+            for m in range(4)) / 4)
+
+        if err_norm <= 1.0:
+            n_steps += 1
+            yield t, h, state, ks
+            if new_state[1] < 0:
+                lo, hi = 0.0, 1.0
+                while hi - lo > 1e-13:
+                    mid = 0.5 * (lo + hi)
+                    if _dp_interpolate(state, h, ks, mid, 1) >= 0:
+                        lo = mid
+                    else:
+                        hi = mid
+                return t + hi * h, True, {"steps": n_steps, "rejected": n_rejected, "nfev": nfev}
+            t += h
+            state = new_state
+            k1 = ks[6]
+            h *= 10.0 if err_norm == 0 else min(10.0, 0.9 * err_norm ** -0.2)
+        else:
+            n_rejected += 1
+            h *= max(0.2, 0.9 * err_norm ** -0.2)
+
+    return t, False, {"steps": n_steps, "rejected": n_rejected, "nfev": nfev}
+
+# (x, y, vx, vy) rows at times t_out from the stored interpolants, in one vectorized pass
+def _rk45_dense(steps, t_out):
+    t_start = np.array([s[0] for s in steps])
+    h_step = np.array([s[1] for s in steps])
+    s_step = np.array([s[2] for s in steps])
+    k_step = np.array([s[3] for s in steps])
+    idx = np.clip(np.searchsorted(t_start, t_out, side="right") - 1, 0, len(steps) - 1)
+    frac = (t_out - t_start[idx]) / h_step[idx]
+    weights = np.stack([frac, frac**2, frac**3, frac**4], axis=1) @ _DP_P.T
+    return s_step[idx] + h_step[idx, None] * np.einsum("nk,nkm->nm", weights, k_step[idx])
+
+# n_out samples evenly spaced up to the landing time
+def _rk45_resample(steps, t_land, landed, n_out):
+    t_out = np.linspace(0, t_land, num=n_out)
+    x_out, y_out, vx_out, vy_out = _rk45_dense(steps, t_out).T
+    if landed:
+        y_out[-1] = 0.0
+    return t_out, x_out, y_out, vx_out, vy_out
+
+# Run a generator to the end: its items and its return value
+def _drain(generator):
+    items = []
+    while True:
+        try:
+            items.append(next(generator))
+        except StopIteration as stop:
+            return items, stop.value
+
+# Adaptive RK45 drag trajectory: n_out samples evenly spaced up to the exact landing time, plus solver statistics
+def integrate_drag_rk45(v0, theta, h0, g=9.81, c=0.005, rtol=1e-6, atol=1e-6, t_end=100, n_out=600):
+    steps, (t_land, landed, stats) = _drain(_rk45_steps(v0, theta, h0, g, c, rtol, atol, t_end))
+    return (*_rk45_resample(steps, t_land, landed, n_out), stats)
+
+# ---------- Lockstep RK45 for many launches ----------
+# Butcher rows and error weights as matrices over the stacked stages, so a stage is one product for all launches
+_DP_A_ROWS = [np.array(row) for row in _DP_A]
+_DP_E_ROW = np.array(_DP_E)
+
+# _drag_rhs on a (4, N) state, written into one (4, N) slot of the stage buffer
+def _drag_rhs_batch(state, g, c, out):
+    vx, vy = state[2], state[3]
+    k = np.sqrt(vx * vx + vy * vy)
+    k *= c
+    out[0] = vx
+    out[1] = vy
+    np.multiply(k, vx, out=out[2])
+    np.negative(out[2], out=out[2])
+    np.multiply(k, vy, out=out[3])
+    out[3] += g
+    np.negative(out[3], out=out[3])
+
+# _dp_step for every launch at once; ks is the (7, 4, N) stage buffer with the first stage already filled in
+def _dp_step_batch(state, h, ks, g, c):
+    flat = ks.reshape(7, -1)
+    for i, row in enumerate(_DP_A_ROWS[1:], 1):
+        stage = state + h * (row @ flat[:i]).reshape(state.shape)
+        _drag_rhs_batch(stage, g, c, ks[i])
+    return stage
+
+# Height on each launch's step interpolant at step fractions frac
+def _dp_height_batch(state, h, ks, frac):
+    weights = _DP_P @ np.array([frac, frac**2, frac**3, frac**4])
+    return state[1] + h * np.einsum("kn,kn->n", weights, ks[:, 1])
+
+# Many adaptive RK45 drag runs in lockstep: each iteration tries one Dormand-Prince step on every launch still in
+# flight, each with its own step size, so a batch costs about as many NumPy passes as its longest run.
+# Step control, landing root-finding and resampling follow _rk45_steps; results agree with integrate_drag_rk45 to
+# rounding (the stage sums are accumulated in a different order). Returns one (t, x, y, vx, vy, stats) per launch.
+def integrate_drag_rk45_batch(v0, theta, h0, g=9.81, c=0.005, rtol=1e-6, atol=1e-6, t_end=100, n_out=600):
+    v0, theta, h0 = (np.array(a, dtype=float).ravel() for a in np.broadcast_arrays(v0, theta, h0))
+    n = v0.size
+    lanes = np.arange(n)
+    state = np.array([np.zeros(n), h0, v0 * np.cos(theta), v0 * np.sin(theta)])
+    k1 = np.empty((4, n))
+    _drag_rhs_batch(state, g, c, k1)
+    t = np.zeros(n)
+    h = np.minimum(1.0, 0.01 * (1.0 + np.abs(v0)) / g)
+    t_land = np.zeros(n)
+    landed = np.zeros(n, dtype=bool)
+    nfev = np.ones(n, dtype=int)
+    n_rejected = np.zeros(n, dtype=int)
+    history = []
+
+    while lanes.size:
+        h = np.minimum(h, t_end - t)
+        ks = np.empty((7, 4, lanes.size))
+        ks[0] = k1
+        new_state = _dp_step_batch(state, h, ks, g, c)
+        nfev[lanes] += 6
+        scale = atol + rtol * np.maximum(np.abs(state), np.abs(new_state))
+        error = h * (_DP_E_ROW @ ks.reshape(7, -1)).reshape(state.shape) / scale
+        err_norm = np.sqrt(np.einsum("mn,mn->n", error, error) / 4)
+        accept = err_norm <= 1.0
+        with np.errstate(divide="ignore"):
+            factor = 0.9 * err_norm ** -0.2
+
+        history.append((lanes[accept], t[accept], h[accept], state[:, accept].T, ks[:, :, accept].transpose(2, 0, 1)))
+        n_rejected[lanes[~accept]] += 1
+
+        # Launches that landed during this step or ran out of time leave the batch
+        down = accept & (new_state[1] < 0)
+        landed[lanes[down]] = True
+        step = accept & ~down
+        t = np.where(step, t + h, t)
+        state = np.where(step, new_state, state)
+        k1 = np.where(step, ks[6], k1)
+        h = h * np.where(step, np.where(err_norm == 0, 10.0, np.minimum(10.0, factor)),
+                         np.maximum(0.2, factor))
+        over = ~down & (t >= t_end)
+        t_land[lanes[over]] = t[over]
+        keep = ~(down | over)
+        lanes, t, h, state, k1 = lanes[keep], t[keep], h[keep], state[:, keep], k1[:, keep]
+
+    lane_ids, t_start, h_step, s_step, k_step = (np.concatenate(column) for column in zip(*history))
+    order = np.argsort(lane_ids, kind="stable")
+    ends = np.cumsum(np.bincount(lane_ids, minlength=n))
+
+    # Landing: bisect the last step's interpolant for y = 0 down to the same 1e-13 fraction, all landings at once
+    last = order[ends[landed] - 1]
+    lo, hi = np.zeros(last.size), np.ones(last.size)
+    while True:
+        going = hi - lo > 1e-13
+        if not going.any():
+            break
+        mid = 0.5 * (lo + hi)
+        above = _dp_height_batch(s_step[last].T, h_step[last], k_step[last].transpose(1, 2, 0), mid) >= 0
+        lo = np.where(going & above, mid, lo)
+        hi = np.where(going & ~above, mid, hi)
+    t_land[landed] = t_start[last] + hi * h_step[last]
+
+    results = []
+    for j, rows in enumerate(np.split(order, ends[:-1])):
+        steps = list(zip(t_start[rows], h_step[rows], s_step[rows], k_step[rows]))
+        stats = {"steps": len(rows), "rejected": int(n_rejected[j]), "nfev": int(nfev[j])}
+        results.append((*_rk45_resample(steps, t_land[j], landed[j], n_out), stats))
+    return results
+
+# Lockstep drag integration that keeps only per-projectile summaries, so memory is O(N) for any flight length.
+# Landing time and range are interpolated linearly between the last sample above ground and the first below it,
+# and projectiles that landed are compacted out of the working arrays.
+def integrate_drag_summary(v0, theta, h0, g=9.81, c=0.005, dt=0.01, t_end=100):
+    v0, theta, h0, c = (np.array(a, dtype=float).ravel() for a in np.broadcast_arrays(v0, theta, h0, c))
+    n = v0.size
+    flight_time = np.full(n, float(t_end))
+    landing_x = np.empty(n)
+    max_height = np.empty(n)
+
+    active = np.arange(n)
+    x = np.zeros(n)
+    y = h0.copy()
+    vx = v0 * np.cos(theta)
+    vy = v0 * np.sin(theta)
+    cdt = c * dt
+    gdt = g * dt
+    apex = h0.copy()
+    damping = np.empty(n)
+    scratch = np.empty(n)
+    below = np.empty(n, dtype=bool)
+
+    for k in range(1, int(t_end / dt + 1e-9) + 2):
+        np.multiply(vx, vx, out=damping)
+        np.multiply(vy, vy, out=scratch)
+        damping += scratch
+        np.sqrt(damping, out=damping)
+        damping *= cdt
+        np.subtract(1.0, damping, out=damping)
+        vx *= damping
+        vy *= damping
+        vy -= gdt
+        x_new = vx * dt
+        x_new += x
+        y_new = vy * dt
+        y_new += y
+        np.maximum(apex, y_new, out=apex)
+
+        np.less(y_new, 0, out=below)
+        if below.any():
+            frac = y[below] / (y[below] - y_new[below])
+            landed = active[below]
+            flight_time[landed] = (k - 1 + frac) * dt
+            landing_x[landed] = x[below] + frac * (x_new[below] - x[below])
+            max_height[landed] = apex[below]
+            keep = ~below
+            active, x_new, y_new, vx, vy, apex = (a[keep] for a in (active, x_new, y_new, vx, vy, apex))
+            if np.ndim(cdt):
+                cdt = cdt[keep]
+            damping, scratch, below = damping[:active.size], scratch[:active.size], below[:active.size]
+        x, y = x_new, y_new
+        if active.size == 0:
+            break
+
+    landing_x[active] = x
+    max_height[active] = apex
+    return flight_time, landing_x, max_height
+
+# One Euler drag trajectory as the (t, x, y) arrays the page originally used; kept for callers of that interface
+def compute_projectile_with_air(v0, theta, h0, g=9.81, c=0.005, dt=0.01):
+    t_points, x_points, y_points, _, _, n_samples = integrate_drag_batch(v0, theta, h0, g, c, dt)
+    n = n_samples[0]
+    return t_points[:n], x_points[:n, 0].copy(), y_points[:n, 0].copy()
+
+# ================= Trajectory Cache =================
+# Thread-safe LRU shared by every session; entries are (t, x, y, vx, vy, stats) tuples of read-only arrays
+class TrajectoryCache:
+    def __init__(self, max_entries=512, max_bytes=64 * 1024**2):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _nbytes(value):
+        return sum(item.nbytes for item in value if isinstance(item, np.ndarray))
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        # Shared across sessions, so nobody may modify a cached array in place
+        for item in value:
+            if isinstance(item, np.ndarray):
+                item.setflags(write=False)
+        size = self._nbytes(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._nbytes(self._entries.pop(key))
+            self._entries[key] = value
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= self._nbytes(evicted)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.bytes, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
+
+# ================= Parameter Sweep =================
+SWEEP_METRICS = {"range": "Range (m)", "max_height": "Maximum Height (m)", "flight_time": "Flight Time (s)"}
+
+# Range, apex height and flight time over a heights x velocities x angles grid, shaped (len(h0), len(v0), len(angle)).
+# Without drag it is the closed form in one broadcast; with drag the whole grid is one lockstep batch.
+def sweep(v0_values, angle_values, h0_values, drag=False, g=G, c=DRAG_COEFFICIENT, dt=0.01):
+    v0 = np.asarray(v0_values, dtype=float)[None, :, None]
+    angle = np.asarray(angle_values, dtype=float)[None, None, :]
+    h0 = np.asarray(h0_values, dtype=float)[:, None, None]
+    theta = np.radians(angle)
+    shape = np.broadcast_shapes(v0.shape, angle.shape, h0.shape)
+
+    if drag:
+        flight_time, landing_x, max_height = integrate_drag_summary(v0, theta, h0, g, c, dt)
+        flight_time, landing_x, max_height = (a.reshape(shape) for a in (flight_time, landing_x, max_height))
+    else:
+        flight_time, landing_x, max_height = (np.broadcast_to(a, shape) for a in summary_no_air(v0, theta, h0, g))
+
+    return {"v0": np.asarray(v0_values, dtype=float), "angle": np.asarray(angle_values, dtype=float),
+            "h0": np.asarray(h0_values, dtype=float), "drag": drag,
+            "flight_time": flight_time, "range": landing_x, "max_height": max_height}
+
+# ================= Simulation API =================
+# One set of page settings; frozen so it can be compared and hashed
+@dataclass(frozen=True)
+class SimulationConfig:
+    v0: float = 50.0
+    angle: float = 45.0
+    h0: float = 0.0
+    air_resistance: bool = False
+    compare_angles: bool = False
+    compare_with_air: bool = False
+    # Extra launches drawn next to the page's own, as (v0, angle in degrees, h0, air_resistance) tuples
+    comparisons: tuple = ()
+    solver: str = "rk45"
+    tol: float = 1e-6
+    g: float = G
+    c: float = DRAG_COEFFICIENT
+    dt: float = 0.01
+    num_points: int = NUM_POINTS
+
+    @property
+    def has_secondary(self):
+        return self.compare_angles and self.angle != 45
+
+
+# Struct-of-arrays record of one flight: sample times with the solver's positions and velocities
+@dataclass
+class Trajectory:
+    t: np.ndarray
+    x: np.ndarray
+    y: np.ndarray
+    vx: np.ndarray
+    vy: np.ndarray
+    stats: dict = None
+
+    @property
+    def flight_time(self):
+        return self.t[-1]
+
+    # Time of the highest point, where vy changes sign (interpolated between the bracketing samples)
+    @property
+    def apex_time(self):
+        falling = np.flatnonzero(self.vy <= 0)
+        if len(falling) == 0:
+            return float(self.t[-1])
+        i = falling[0]
+        if i == 0:
+            return float(self.t[0])
+        w = self.vy[i - 1] / (self.vy[i - 1] - self.vy[i])
+        return float(self.t[i - 1] + w * (self.t[i] - self.t[i - 1]))
+
+    # State at any time (scalar or array) by binary search over the samples and linear interpolation;
+    # times outside the flight are clamped to launch or landing
+    def state_at(self, t):
+        t = np.clip(t, self.t[0], self.t[-1])
+        i = np.clip(np.searchsorted(self.t, t, side="right"), 1, len(self.t) - 1)
+        span = self.t[i] - self.t[i - 1]
+        w = np.where(span > 0, (t - self.t[i - 1]) / np.where(span > 0, span, 1.0), 0.0)
+
+        def at(values):
+            return values[i - 1] + w * (values[i] - values[i - 1])
+
+        vx, vy = at(self.vx), at(self.vy)
+        return {"t": t, "x": at(self.x), "y": at(self.y), "vx": vx, "vy": vy, "speed": np.hypot(vx, vy)}
+
+
+# Named trajectories of one run ("primary", "secondary", "no_air", "with_air", "launch_1", ...) plus plot limits
+# and solver totals
+@dataclass
+class TrajectorySet:
+    config: SimulationConfig
+    trajectories: dict
+    t_max: float
+    x_max: float
+    y_max: float
+    solver_steps: int = 0
+    solver_nfev: int = 0
+    drag_total: int = 0
+    drag_cached: int = 0
+
+    def __getitem__(self, name):
+        return self.trajectories[name]
+
+    def __contains__(self, name):
+        return name in self.trajectories
+
+    # Complete streams over the finished trajectories, for playback code that consumes streams
+    def streams(self):
+        return {name: TrajectoryStream.from_result((trajectory.t, trajectory.x, trajectory.y, trajectory.vx,
+                                                    trajectory.vy, trajectory.stats))
+                for name, trajectory in self.trajectories.items()}
+
+    # Numbers behind the page's Final Results block
+    def final_results(self):
+        primary = self.trajectories["primary"]
+        return {
+            "flight_time": float(primary.t[-1]),
+            "t_max_height": primary.apex_time,
+            # The last sample is the landing point (exact for RK45 and no-air, first overshoot for Euler)
+            "range": float(primary.x[-1]),
+            "max_height": float(np.max(primary.y)),
+            # The vacuum parabola of the launch, as the worksheets write it
+            "equation": (f"y(x) = {self.config.h0:.2f} + x.tan({self.config.angle:.2f}°) - "
+                         f"({self.config.g:g}/(2*({self.config.v0:.2f}·cos({self.config.angle:.2f}°))²)).x²"),
+        }
+
+
+# One trajectory to compute: its model ("drag" or "no_air") and launch state, with theta in radians
+Launch = namedtuple("Launch", ["model", "v0", "theta", "h0"])
+
+# Normalized physics inputs plus solver settings; rounding absorbs float noise from the widgets
+def trajectory_key(config, model, launch):
+    return (model, round(float(launch.v0), 9), round(float(launch.theta), 12), round(float(launch.h0), 9),
+            config.g, config.c, config.num_points,
+            config.tol if model == "rk45" else config.dt if model == "euler" else None)
+
+def _cached(cache, key, compute):
+    value = cache.get(key) if cache is not None else None
+    if value is None:
+        value = compute()
+        if cache is not None:
+            cache.put(key, value)
+    return value
+
+# Drag trajectories of Launches by name: cache hits are reused, every miss is integrated in one lockstep batch
+def _drag_trajectories(config, drag_launches, cache):
+    results = {}
+    pending = {}
+    for name, launch in drag_launches.items():
+        cached = cache.get(trajectory_key(config, config.solver, launch)) if cache is not None else None
+        if cached is None:
+            pending[name] = launch
+        else:
+            results[name] = cached
+
+    v0, theta, h0 = (np.array([getattr(launch, field) for launch in pending.values()])
+                     for field in ("v0", "theta", "h0"))
+    if len(pending) >= RK45_BATCH_LIMIT and config.solver == "rk45":
+        batch = integrate_drag_rk45_batch(v0, theta, h0, config.g, config.c, rtol=config.tol, atol=config.tol,
+                                          n_out=config.num_points)
+        results.update(zip(pending, batch))
+    elif pending and config.solver == "rk45":
+        for name, launch in pending.items():
+            results[name] = integrate_drag_rk45(launch.v0, launch.theta, launch.h0, config.g, config.c,
+                                                rtol=config.tol, atol=config.tol, n_out=config.num_points)
+    elif pending:
+        t_drag, *columns, n_drag = integrate_drag_batch(v0, theta, h0, config.g, config.c, config.dt)
+        for j, name in enumerate(pending):
+            n = n_drag[j]
+            # Explicit Euler: one RHS evaluation per step
+            stats = {"steps": n - 1, "rejected": 0, "nfev": n - 1}
+            results[name] = (t_drag[:n].copy(), *(column[:n, j].copy() for column in columns), stats)
+    if cache is not None:
+        for name, launch in pending.items():
+            cache.put(trajectory_key(config, config.solver, launch), results[name])
+    return results, len(drag_launches) - len(pending)
+
+# Trajectories a configuration shows, by name, as Launches. The page's comparisons are entries like any other:
+# the complementary angle, the air comparison pair and every extra launch ("launch_1", "launch_2", ...).
+def trajectory_plan(config):
+    theta = np.radians(config.angle)
+    model = "drag" if config.air_resistance else "no_air"
+    plan = {"primary": Launch(model, config.v0, theta, config.h0)}
+    if config.has_secondary:
+        plan["secondary"] = Launch(model, config.v0, np.radians(90 - config.angle), config.h0)
+    if config.compare_with_air:
+        plan["no_air"] = Launch("no_air", config.v0, theta, config.h0)
+        plan["with_air"] = Launch("drag", config.v0, theta, config.h0)
+    for k, (v0, angle, h0, air_resistance) in enumerate(config.comparisons, 1):
+        plan[f"launch_{k}"] = Launch("drag" if air_resistance else "no_air", float(v0), np.radians(angle), float(h0))
+    return plan
+
+# Each distinct launch with the first name that uses it; e.g. with air resistance on, the primary and the
+# "with air" trajectory are the same launch and are computed once
+def _unique_launches(plan):
+    launches = {}
+    for name, launch in plan.items():
+        launches.setdefault(launch, name)
+    return launches
+
+def _no_air(config, launch, cache):
+    return _cached(cache, trajectory_key(config, "no_air", launch),
+                   lambda: compute_projectile_no_air(launch.v0, launch.theta, launch.h0, config.g, config.num_points))
+
+def _trajectory_set(config, values, drag_values, drag_cached):
+    trajectories = {name: Trajectory(*value) for name, value in values.items()}
+    return TrajectorySet(
+        config=config,
+        trajectories=trajectories,
+        t_max=max(trajectory.t[-1] for trajectory in trajectories.values()),
+        x_max=max(np.max(trajectory.x) * 1.1 for trajectory in trajectories.values()),
+        y_max=max(np.max(trajectory.y) * 1.2 for trajectory in trajectories.values()),
+        solver_steps=sum(value[-1]["steps"] for value in drag_values),
+        solver_nfev=sum(value[-1]["nfev"] for value in drag_values),
+        drag_total=len(drag_values),
+        drag_cached=drag_cached,
+    )
+
+# All trajectories the page shows for one configuration
+def simulate(config, cache=None):
+    plan = trajectory_plan(config)
+    launches = _unique_launches(plan)
+    drag_launches = {name: launch for launch, name in launches.items() if launch.model == "drag"}
+    drag, drag_cached = _drag_trajectories(config, drag_launches, cache)
+    values = {name: drag[launches[launch]] if launch.model == "drag" else _no_air(config, launch, cache)
+              for name, launch in plan.items()}
+    return _trajectory_set(config, values, list(drag.values()), drag_cached)
+
+# ================= Streaming =================
+# Samples per chunk of a streamed trajectory; at dt = 0.01 one chunk is 2.56 s of flight
+STREAM_CHUNK_SAMPLES = 256
+
+def _chunk(times, states):
+    return (np.concatenate(times), *np.concatenate(states).T)
+
+# Euler drag trajectory in chunks of (t, x, y, vx, vy) as it is integrated. Returns the whole trajectory with
+# its stats, sample for sample the same as the batch integrator's.
+def stream_drag_euler(v0, theta, h0, g=9.81, c=0.005, dt=0.01, t_end=100, chunk_samples=STREAM_CHUNK_SAMPLES):
+    rows = int(t_end / dt + 1e-9) + 2
+    state = (0.0, float(h0), v0 * math.cos(theta), v0 * math.sin(theta))
+    chunks = []
+    start = 0
+    while start < rows and state[1] >= 0:
+        # Later chunks restart from the previous chunk's last state, which lands in their row 0 and is dropped
+        skip = 1 if start else 0
+        buffers = np.empty((4, min(chunk_samples, rows - start) + skip))
+        n, state = _integrate_drag_scalar(state, g, c, dt, *buffers)
+        chunk = (np.arange(start, start + n - skip) * dt, *(buffer[skip:n] for buffer in buffers))
+        chunks.append(chunk)
+        start += n - skip
+        yield chunk
+    t, x, y, vx, vy = (np.concatenate(column) for column in zip(*chunks))
+    # Explicit Euler: one RHS evaluation per step
+    return t, x, y, vx, vy, {"steps": start - 1, "rejected": 0, "nfev": start - 1}
+
+# RK45 drag trajectory in chunks sampled every dt_out from the dense output, ending with the exact landing
+# sample. A step's samples are emitted once the next step is accepted, i.e. when they are known to be before
+# the landing. Returns the same n_out-sample trajectory as integrate_drag_rk45.
+def stream_drag_rk45(v0, theta, h0, g=9.81, c=0.005, rtol=1e-6, atol=1e-6, t_end=100, n_out=600, dt_out=0.01,
+                     chunk_samples=STREAM_CHUNK_SAMPLES):
+    stepper = _rk45_steps(v0, theta, h0, g, c, rtol, atol, t_end)
+    steps = []
+    emitted = 0
+    times, states = [], []
+    while True:
+        try:
+            steps.append(next(stepper))
+        except StopIteration as stop:
+            t_land, landed, stats = stop.value
+            break
+        if len(steps) > 1:
+            ready = int(math.ceil(steps[-1][0] / dt_out))
+            if ready > emitted:
+                t_ready = np.arange(emitted, ready) * dt_out
+                times.append(t_ready)
+                states.append(_rk45_dense(steps[-2:-1], t_ready))
+                emitted = ready
+            if sum(map(len, times)) >= chunk_samples:
+                yield _chunk(times, states)
+                times, states = [], []
+
+    t_ready = np.r_[np.arange(emitted, int(math.ceil(t_land / dt_out))) * dt_out, t_land]
+    times.append(t_ready)
+    states.append(_rk45_dense(steps[-1:], t_ready))
+    if landed:
+        states[-1][-1, 1] = 0.0
+    yield _chunk(times, states)
+    return (*_rk45_resample(steps, t_land, landed, n_out), stats)
+
+
+# Growing view of one trajectory fed by a chunk generator. Playback calls ensure(t), and chunks are pulled only
+# when it needs a later time than the buffer holds, so the solver is never more than one chunk ahead of the
+# screen. When the generator finishes, its return value is the full-resolution trajectory, assembled once and
+# handed to on_complete (e.g. to put it in the cache).
+class TrajectoryStream:
+    def __init__(self, chunks, on_complete=None, capacity=4 * STREAM_CHUNK_SAMPLES):
+        self._chunks = chunks
+        self._on_complete = on_complete
+        self._columns = [np.empty(capacity) for _ in range(5)]
+        self.size = 0
+        self.result = None
+        self.cached = False
+
+    # A stream that is complete from the start (cache hit or closed form)
+    @classmethod
+    def from_result(cls, value):
+        stream = cls(iter(()), capacity=0)
+        stream._columns = list(value[:5])
+        stream.size = len(value[0])
+        stream.result = value
+        stream.cached = True
+        return stream
+
+    @property
+    def complete(self):
+        return self.result is not None
+
+    @property
+    def t(self):
+        return self._columns[0][:self.size]
+
+    @property
+    def x(self):
+        return self._columns[1][:self.size]
+
+    @property
+    def y(self):
+        return self._columns[2][:self.size]
+
+    @property
+    def vx(self):
+        return self._columns[3][:self.size]
+
+    @property
+    def vy(self):
+        return self._columns[4][:self.size]
+
+    # The samples received so far, e.g. for state_at
+    def view(self):
+        return Trajectory(self.t, self.x, self.y, self.vx, self.vy)
+
+    def _pull(self):
+        try:
+            chunk = next(self._chunks)
+        except StopIteration as stop:
+            self.result = stop.value
+            if self._on_complete is not None:
+                self._on_complete(self.result)
+            return
+        n = len(chunk[0])
+        if self.size + n > len(self._columns[0]):
+            capacity = max(2 * len(self._columns[0]), self.size + n)
+            self._columns = [np.concatenate([column[:self.size], np.empty(capacity - self.size)])
+                             for column in self._columns]
+        for column, values in zip(self._columns, chunk):
+            column[self.size:self.size + n] = values
+        self.size += n
+
+    # Pull chunks until the samples reach time t or the flight is over
+    def ensure(self, t):
+        while not self.complete and (self.size == 0 or self._columns[0][self.size - 1] < t):
+            self._pull()
+
+    def finish(self):
+        while not self.complete:
+            self._pull()
+        return self.result
+
+
+# One stream per trajectory of the configuration; names that are the same launch share a stream. Cached and
+# no-air trajectories arrive complete, drag trajectories missing from the cache are integrated chunk by chunk
+# and put in the cache when they finish.
+def open_streams(config, cache=None, chunk_samples=STREAM_CHUNK_SAMPLES):
+    plan = trajectory_plan(config)
+    streams = {}
+    for launch in _unique_launches(plan):
+        if launch.model == "no_air":
+            streams[launch] = TrajectoryStream.from_result(_no_air(config, launch, cache))
+            continue
+        key = trajectory_key(config, config.solver, launch)
+        value = cache.get(key) if cache is not None else None
+        if value is not None:
+            streams[launch] = TrajectoryStream.from_result(value)
+            continue
+        if config.solver == "rk45":
+            chunks = stream_drag_rk45(launch.v0, launch.theta, launch.h0, config.g, config.c, rtol=config.tol,
+                                      atol=config.tol, n_out=config.num_points, dt_out=config.dt,
+                                      chunk_samples=chunk_samples)
+        else:
+            chunks = stream_drag_euler(launch.v0, launch.theta, launch.h0, config.g, config.c, config.dt,
+                                       chunk_samples=chunk_samples)
+        on_complete = None if cache is None else lambda value, key=key: cache.put(key, value)
+        streams[launch] = TrajectoryStream(chunks, on_complete)
+    return {name: streams[launch] for name, launch in plan.items()}
+
+# The TrajectorySet of a configuration from its streams, finishing any that are still running
+def collect_streams(config, streams):
+    plan = trajectory_plan(config)
+    values = {name: stream.finish() for name, stream in streams.items()}
+    drag_streams = list({id(stream): stream for name, stream in streams.items()
+                         if plan[name].model == "drag"}.values())
+    return _trajectory_set(config, values, [stream.result for stream in drag_streams],
+                           sum(stream.cached for stream in drag_streams))
+
+# ================= Launch Angle Optimizer =================
+OPTIMIZER_GOALS = {
+    "max_range": "🎯 Maximum Range",
+    "target_distance": "📏 Land at a Target Distance",
+    "target_height": "⛰️ Reach a Target Height",
+}
+
+
+@dataclass
+class AngleSolution:
+    goal: str
+    angles: list          # degrees; a reachable target distance usually has a low and a high solution
+    values: list          # range (m) or maximum height (m) at each angle
+    evaluations: int = 0  # distinct angles the search asked for
+    integrations: int = 0 # drag integrations actually run; the rest came from the trajectory cache
+
+
+# Range and maximum height under drag as functions of the launch angle (degrees), memoized per angle.
+# Every trajectory goes through the shared cache, so repeating a solve costs no integrations at all.
+class _AngleObjective:
+    def __init__(self, config, cache):
+        self.config = config
+        self.cache = cache
+        self.memo = {}
+        self.integrations = 0
+
+    def __call__(self, angle):
+        if angle not in self.memo:
+            probe = Launch("drag", self.config.v0, np.radians(angle), self.config.h0)
+            drag, cached = _drag_trajectories(self.config, {"probe": probe}, self.cache)
+            self.integrations += 1 - cached
+            _, x, y = drag["probe"][:3]
+            self.memo[angle] = (float(x[-1]), float(np.max(y)))
+        return self.memo[angle]
+
+    def range(self, angle):
+        return self(angle)[0]
+
+    def height(self, angle):
+        return self(angle)[1]
+
+
+# Golden-section search for the maximum of a unimodal function on [lo, hi]
+def _golden_section_max(f, lo, hi, xtol):
+    inv_phi = (np.sqrt(5) - 1) / 2
+    a, b = lo, hi
+    c, d = b - inv_phi * (b - a), a + inv_phi * (b - a)
+    fc, fd = f(c), f(d)
+    while b - a > xtol:
+        if fc >= fd:
+            b, d, fd = d, c, fc
+            c = b - inv_phi * (b - a)
+            fc = f(c)
+        else:
+            a, c, fc = c, d, fd
+            d = a + inv_phi * (b - a)
+            fd = f(d)
+    return (c, fc) if fc >= fd else (d, fd)
+
+
+# Root of f(angle) = target inside [lo, hi] by the Illinois variant of regula falsi; None if not bracketed
+def _bracketed_root(f, target, lo, hi, xtol, max_iter=60):
+    a, b = lo, hi
+    fa, fb = f(a) - target, f(b) - target
+    if fa == 0:
+        return a
+    if fb == 0:
+        return b
+    if fa * fb > 0:
+        return None
+    side = 0
+    for _ in range(max_iter):
+        if b - a <= xtol:
+            break
+        c = (a * fb - b * fa) / (fb - fa)
+        fc = f(c) - target
+        if fc == 0:
+            return c
+        if fc * fb > 0:
+            b, fb = c, fc
+            if side == -1:
+                fa /= 2
+            side = -1
+        else:
+            a, fa = c, fc
+            if side == 1:
+                fb /= 2
+            side = 1
+    return (a + b) / 2
+
+
+# Launch angle under drag for v0, h0, g and c of the config, integrated with the config's solver.
+# Range rises then falls with the angle, so the maximum is a golden-section search over [0°, 90°] and a target
+# distance is searched on each side of it; the maximum height only grows with the angle, so it has one root.
+def optimize_angle(config, goal="max_range", target=None, cache=None, xtol=0.01):
+    objective = _AngleObjective(config, cache)
+    if goal in ("max_range", "target_distance"):
+        best_angle, _ = _golden_section_max(objective.range, 0.0, 90.0, xtol)
+
+    if goal == "max_range":
+        angles = [best_angle]
+    elif goal == "target_distance":
+        roots = (_bracketed_root(objective.range, target, 0.0, best_angle, xtol),
+                 _bracketed_root(objective.range, target, best_angle, 90.0, xtol))
+        angles = [angle for angle in roots if angle is not None]
+    elif goal == "target_height":
+        # The apex is never below the launch height, so a target at or under the 0° apex is reached at any angle;
+        # 0° is the flattest of them
+        if objective.height(0.0) >= target:
+            angles = [0.0]
+        else:
+            root = _bracketed_root(objective.height, target, 0.0, 90.0, xtol)
+            angles = [] if root is None else [root]
+    else:
+        raise ValueError(f"Unknown goal: {goal}")
+
+    values = [objective.height(angle) if goal == "target_height" else objective.range(angle) for angle in angles]
+    return AngleSolution(goal, [float(angle) for angle in angles], values, evaluations=len(objective.memo), integrations=objective.integrations)
@@ -0,0 +1,142 @@
+import io
+import json
+import os
+from dataclasses import asdict, fields
+
+import numpy as np
+
+from simulation import SOLVER_LABELS, SimulationConfig, Trajectory, TrajectorySet
+
+# ================= Run Files =================
+# Computed runs as compact binary files that load without a copy:
+#   8-byte magic, 8-byte little-endian header length, UTF-8 JSON header, then the raw arrays.
+# The header holds the run's metadata (the SimulationConfig: v0, angle, h0, c, solver, dt, ...) and the dtype,
+# shape and offset of every array. Arrays start on ALIGNMENT-byte boundaries, so a loader maps the file
+# and takes views; nothing is parsed or copied until a sample is read. np.savez was not used because
+# np.load cannot memory-map the members of an .npz archive.
+
+RUN_FILE_MAGIC = b"PRUN\x00\x01\r\n"
+RUN_FILE_SUFFIX = ".prun"
+ALIGNMENT = 64
+# Columns of one trajectory block, stored as rows of a (5, samples) array
+TRAJECTORY_COLUMNS = ("t", "x", "y", "vx", "vy")
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+# NumPy scalars in the metadata (solver stats, plot limits) are written as plain numbers
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+# Write a header and arrays to a path or a binary file object
+def write_run_file(target, kind, meta, arrays):
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps({"kind": kind, "meta": meta, "arrays": layout}, default=_json_default,
+                        ensure_ascii=False).encode("utf-8")
+    data_start = _aligned(len(RUN_FILE_MAGIC) + 8 + len(header))
+
+    f = open(target, "wb") if isinstance(target, (str, os.PathLike)) else target
+    try:
+        f.write(RUN_FILE_MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        position = len(RUN_FILE_MAGIC) + 8 + len(header)
+        for name, array in arrays.items():
+            start = data_start + layout[name]["offset"]
+            f.write(b"\0" * (start - position))
+            f.write(memoryview(array).cast("B"))
+            position = start + array.nbytes
+    finally:
+        if f is not target:
+            f.close()
+
+
+# (kind, meta, arrays) of a run file. A path is memory-mapped read-only; a bytes-like object (e.g. an upload)
+# is viewed in place. Either way the arrays are read-only views.
+def read_run_file(source):
+    if isinstance(source, (str, os.PathLike)):
+        buffer = np.memmap(source, dtype=np.uint8, mode="r")
+    else:
+        buffer = np.frombuffer(source, dtype=np.uint8)
+    magic_end = len(RUN_FILE_MAGIC)
+    if buffer.size < magic_end + 8 or bytes(buffer[:magic_end]) != RUN_FILE_MAGIC:
+        raise ValueError("Not a projectile run file")
+    header_length = int.from_bytes(bytes(buffer[magic_end:magic_end + 8]), "little")
+    header_end = magic_end + 8 + header_length
+    if buffer.size < header_end:
+        raise ValueError("Run file is truncated")
+    header = json.loads(bytes(buffer[magic_end + 8:header_end]).decode("utf-8"))
+    data_start = _aligned(header_end)
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        start = data_start + spec["offset"]
+        if start + count * dtype.itemsize > buffer.size:
+            raise ValueError("Run file is truncated")
+        arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+    return header["kind"], header["meta"], arrays
+
+
+# The bytes of a file written by save(target, value), e.g. for a download button
+def run_file_bytes(save, value):
+    buffer = io.BytesIO()
+    save(buffer, value)
+    return buffer.getvalue()
+
+
+# ---------- Trajectory Sets ----------
+# One (5, samples) block per trajectory; plot limits and solver totals go in the header, so loading
+# never has to read the samples
+def save_trajectory_set(target, trajectory_set):
+    meta = {
+        "config": asdict(trajectory_set.config),
+        "columns": TRAJECTORY_COLUMNS,
+        "stats": {name: trajectory.stats for name, trajectory in trajectory_set.trajectories.items()},
+        **{field: getattr(trajectory_set, field) for field in ("t_max", "x_max", "y_max", "solver_steps",
+                                                               "solver_nfev", "drag_total", "drag_cached")},
+    }
+    arrays = {name: np.stack([getattr(trajectory, column) for column in TRAJECTORY_COLUMNS])
+              for name, trajectory in trajectory_set.trajectories.items()}
+    write_run_file(target, "trajectory_set", meta, arrays)
+
+
+def load_trajectory_set(source):
+    kind, meta, arrays = read_run_file(source)
+    if kind != "trajectory_set":
+        raise ValueError(f"Expected a trajectory run file, got a {kind} file")
+    known = {field.name for field in fields(SimulationConfig)}
+    config = {key: value for key, value in meta["config"].items() if key in known}
+    config["comparisons"] = tuple(tuple(launch) for launch in config.get("comparisons", ()))
+    if config.get("solver", "rk45") not in SOLVER_LABELS:
+        raise ValueError(f"Unknown solver {config['solver']!r} in the run file")
+    trajectories = {name: Trajectory(*block, stats=meta["stats"].get(name)) for name, block in arrays.items()}
+    return TrajectorySet(config=SimulationConfig(**config), trajectories=trajectories,
+                         **{field: meta[field] for field in ("t_max", "x_max", "y_max", "solver_steps",
+                                                             "solver_nfev", "drag_total", "drag_cached")})
+
+
+# ---------- Sweeps ----------
+# A sweep() result: its grids and metric arrays, with the scalar entries (drag, elapsed) as metadata
+def save_sweep(target, result):
+    arrays = {key: value for key, value in result.items() if isinstance(value, np.ndarray)}
+    meta = {key: value for key, value in result.items() if key not in arrays}
+    write_run_file(target, "sweep", meta, arrays)
+
+
+def load_sweep(source):
+    kind, meta, arrays = read_run_file(source)
+    if kind != "sweep":
+        raise ValueError(f"Expected a sweep run file, got a {kind} file")
+    return {**meta, **arrays}